@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""
+Exhaustive search of standard form tables with n m-configurations and k symbols, busy beaver style.
+
+Tables are generated in tree normal form: starting from an empty table, a machine is run on a blank tape until it
+reaches an m-configuration and symbol with no rule, and only then is a rule filled in, in every possible way, each
+child resuming from the configuration its parent reached. Tables that differ only in naming of m-configurations or
+symbols, or in mirroring left and right, are generated once. Each table reached is classified as halted, cycling
+(in place or translated along the tape), or undecided after a step budget.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+from typing import NamedTuple, Generator, Union
+
+from machine import TuringMachine, LoopDetector, Behavior, E, L, R
+
+# Rules as (m-configuration, symbol) -> (written symbol, move, final m-configuration), all as small integers
+Rules = dict[tuple[int, int], tuple[int, int, int]]
+
+
+class SearchResult(NamedTuple):
+    table: str          # In the standard text format, e.g. '1RB1LB_1LA---'
+    kind: str           # 'halted', 'cycle', 'translated cycle' or 'undecided'
+    steps: int          # Steps to halting or to the start of the cycle; the step budget if undecided
+    score: int = 0      # Non-blank squares when halted
+    period: int = 0
+    shift: int = 0
+
+
+def m_config_name(i: int) -> str:
+    return chr(ord('A') + i)
+
+
+def symbol_name(i: int) -> str:
+    return E if i == 0 else str(i)
+
+
+# Standard text format: the rules for each m-configuration as written symbol, move and final m-configuration (or
+# '---' for no rule), one group per m-configuration separated by '_'
+def to_text(rules: Rules, n: int, k: int) -> str:
+    return '_'.join(''.join('{}{}{}'.format(rules[(q, s)][0], 'LR'[rules[(q, s)][1] > 0],
+                                            m_config_name(rules[(q, s)][2])) if (q, s) in rules else '---'
+                            for s in range(k))
+                    for q in range(n))
+
+
+def from_text(text: str) -> Rules:
+    return {(q, s): (int(rule[0]), {'L': -1, 'R': 1}[rule[1]], ord(rule[2]) - ord('A'))
+            for q, group in enumerate(text.split('_'))
+            for s, rule in enumerate(group[i:i + 3] for i in range(0, len(group), 3))
+            if rule != '---'}
+
+
+def instructions(rules: Rules) -> dict:
+    table = {m_config_name(0): {}}
+    for (q, s), (write, move, final) in rules.items():
+        table.setdefault(m_config_name(q), {})[symbol_name(s)] = Behavior([symbol_name(write), R if move > 0 else L],
+                                                                          m_config_name(final))
+    return table
+
+
+# Run machine until it terminates or reaches max_steps
+def _classify(machine: TuringMachine, max_steps: int) -> Union[SearchResult, None]:
+    detector = LoopDetector(machine)
+    while machine._step < max_steps:
+        termination = detector.step()
+        if termination is not None:
+            if termination.kind != 'halted':
+                return SearchResult('', termination.kind, termination.step, 0, termination.period, termination.shift)
+            return SearchResult('', 'halted', termination.step, sum(c != E for c in machine.str_tape()))
+    return SearchResult('', 'undecided', max_steps)
+
+
+# Every way to fill in the rule the machine (halted for lack of one) needs next, in tree normal form
+def _children(rules: Rules, machine: TuringMachine, n: int, k: int) -> list[Rules]:
+    scanned = machine._tape.peek(machine._position)
+    q, s = ord(machine._m_configuration) - ord('A'), 0 if scanned == E else int(scanned)
+    if (q, s) in rules:
+        return []
+    # New m-configurations and symbols are only ever the next unused ones; the first move is always right
+    states = range(min(n, 2 + max([0] + [final for _, _, final in rules.values()])))
+    symbols = range(min(k, 2 + max([0] + [write for write, _, _ in rules.values()])))
+    moves = (1,) if not rules else (-1, 1)
+    return [{**rules, (q, s): (write, move, final)} for write in symbols for move in moves for final in states]
+
+
+# Classify the table given by rules and, depth first, every table it leads to; machine is in the configuration
+# rules halted in (or None to start from a blank tape)
+def _explore(rules: Rules, n: int, k: int, max_steps: int,
+             machine: TuringMachine = None) -> Generator[tuple[SearchResult, Rules, TuringMachine], None, None]:
+    stack = [(rules, machine)]
+    while stack:
+        rules, parent = stack.pop()
+        table = instructions(rules)
+        machine = TuringMachine(m_config_name(0), table) if parent is None else parent.branch(table)
+        result = _classify(machine, max_steps)._replace(table=to_text(rules, n, k))
+        yield result, rules, machine
+        if result.kind == 'halted':
+            stack.extend((child, machine) for child in reversed(_children(rules, machine, n, k)))
+
+
+def _search_task(task: tuple[str, bool, int, int, int]) -> tuple[str, list[SearchResult]]:
+    text, subtree, n, k, max_steps = task
+    results = (result for result, _, _ in _explore(from_text(text), n, k, max_steps))
+    return text, list(results) if subtree else [next(results)]
+
+
+# The tables with split_depth rules, as the roots of subtrees searched in parallel, and those with fewer, classified
+# on their own; as (table, whether to search the subtree) pairs
+def _tasks(n: int, k: int, max_steps: int, split_depth: int) -> list[tuple[str, bool]]:
+    tasks, frontier = [], [({}, None)]
+    while frontier:
+        rules, machine = frontier.pop()
+        if len(rules) == split_depth:
+            tasks.append((to_text(rules, n, k), True))
+            continue
+        result, _, machine = next(_explore(rules, n, k, max_steps, machine))
+        tasks.append((to_text(rules, n, k), False))
+        if result.kind == 'halted':
+            frontier.extend((child, machine) for child in reversed(_children(rules, machine, n, k)))
+    return tasks
+
+
+# Every standard form table with n m-configurations and k symbols, classified after running for up to max_steps
+# steps; subtrees are searched in parallel, in any order. If checkpoint is the name of a file, finished subtrees
+# are recorded in it (along with counts of each kind of table and the best halting table found), and skipped when
+# the same search is run again
+def search(n: int, k: int = 2, max_steps: int = 1000, processes: int = None, checkpoint: str = None,
+           split_depth: int = 3) -> Generator[SearchResult, None, None]:
+    tasks = _tasks(n, k, max_steps, split_depth)
+    state = {'n': n, 'k': k, 'max_steps': max_steps, 'completed': [], 'counts': {}, 'champion': None}
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            saved = json.load(f)
+        assert (saved['n'], saved['k'], saved['max_steps']) == (n, k, max_steps), "Checkpoint is for another search"
+        state = saved
+    completed = set(state['completed'])
+    pending = [(text, subtree, n, k, max_steps) for text, subtree in tasks if text not in completed]
+
+    def finish(text: str, results: list[SearchResult]) -> None:
+        state['completed'].append(text)
+        for result in results:
+            state['counts'][result.kind] = state['counts'].get(result.kind, 0) + 1
+            champion = state['champion'] and SearchResult(*state['champion'])
+            if result.kind == 'halted' and (not champion or (result.score, result.steps) >
+                                            (champion.score, champion.steps)):
+                state['champion'] = list(result)
+        if checkpoint is not None:
+            with open(checkpoint + '.tmp', 'w') as f:
+                json.dump(state, f)
+            os.replace(checkpoint + '.tmp', checkpoint)
+
+    if processes == 1:
+        finished = map(_search_task, pending)
+        for text, results in finished:
+            yield from results
+            finish(text, results)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for text, results in pool.imap_unordered(_search_task, pending):
+            yield from results
+            finish(text, results)
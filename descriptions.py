@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""
+Walking the space of description numbers (D.N.s), as in Turing's diagonal argument (Turing p. 246).
+"""
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+from functools import lru_cache
+from typing import NamedTuple, Generator, Union
+
+from machine import Table, TuringMachine, FORMAT_CHARS
+
+
+# ======== Well-formed description numbers
+
+# A DFA for the D.N. grammar, (3 1+ 3 2* 3 2* [456] 3 1+ 7)+; state 0 is both the start and the only accepting state
+_DN_TRANSITIONS = {
+    0: {'3': 1},                                # Start of an instruction
+    1: {'1': 2},                                # Initial m-configuration
+    2: {'1': 2, '3': 3},
+    3: {'2': 3, '3': 4},                        # Scanned symbol
+    4: {'2': 4, '4': 5, '5': 5, '6': 5},        # Written symbol, then move
+    5: {'3': 6},                                # Final m-configuration
+    6: {'1': 7},
+    7: {'1': 7, '7': 0},
+}
+
+
+@lru_cache(maxsize=None)
+def _can_finish(state: int, length: int) -> bool:
+    if length == 0:
+        return state == 0
+    return any(_can_finish(following, length - 1) for following in _DN_TRANSITIONS[state].values())
+
+
+# The smallest string of digits of the same length as digits, and not less than it, that the DFA accepts
+def _smallest_accepted(digits: str, i: int = 0, state: int = 0, tight: bool = True) -> Union[str, None]:
+    if i == len(digits):
+        return '' if state == 0 else None
+    for char, following in sorted(_DN_TRANSITIONS[state].items()):
+        if tight and char < digits[i]:
+            continue
+        if not _can_finish(following, len(digits) - i - 1):
+            continue
+        rest = _smallest_accepted(digits, i + 1, following, tight and char == digits[i])
+        if rest is not None:
+            return char + rest
+    return None
+
+
+# The smallest number not less than n with the form of a D.N.; jumps straight over every number that can't be one
+def next_candidate(n: int) -> int:
+    digits = str(max(n, 1))
+    for length in itertools.count(len(digits)):
+        candidate = _smallest_accepted(digits if length == len(digits) else '1' * length)
+        if candidate is not None:
+            return int(candidate)
+
+
+# Instructions of a D.N., as (initial m-configuration, scanned symbol) pairs
+def _rules(dn: str) -> list[tuple[int, int]]:
+    return [(instruction.split('3')[1].count('1'), len(instruction.split('3')[2]))
+            for instruction in dn.split('7')[:-1]]
+
+
+# A D.N. is well formed if it has the form of one and gives just one instruction for each m-configuration and symbol
+def is_well_formed(dn: Union[int, str]) -> bool:
+    dn = str(dn)
+    state = 0
+    for char in dn:
+        state = _DN_TRANSITIONS[state].get(char)
+        if state is None:
+            return False
+    rules = _rules(dn)
+    return state == 0 and len(dn) > 0 and len(set(rules)) == len(rules)
+
+
+# Well formed D.N.s from start up to (but not including) stop, in increasing order
+def description_numbers(start: int, stop: int = None) -> Generator[int, None, None]:
+    n = next_candidate(start)
+    while stop is None or n < stop:
+        rules = _rules(str(n))
+        if len(set(rules)) == len(rules):
+            yield n
+        n = next_candidate(n + 1)
+
+
+# ======== Decoding and running, in parallel
+
+class Description(NamedTuple):
+    number: int
+    table: Table
+    steps: Union[int, None] = None      # Steps run (fewer than asked for if the machine halted)
+    tape: Union[str, None] = None       # The tape after running
+
+
+# The m-configuration a decoded machine starts in (the first, q1, in the 'tuples' naming)
+INITIAL_M_CONFIG = FORMAT_CHARS['tuples']['m_config_format_fn'](0)
+
+
+def describe(dn: int, steps: int = None) -> Description:
+    table = Table(dn)
+    if steps is None:
+        return Description(dn, table)
+    machine = TuringMachine(INITIAL_M_CONFIG, table)
+    return Description(dn, table, machine.run(steps), machine.str_tape())
+
+
+def _scan_chunk(chunk: tuple[int, int, Union[int, None]]) -> list[Description]:
+    start, stop, steps = chunk
+    return [describe(dn, steps) for dn in description_numbers(start, stop)]
+
+
+# Decode (and, if steps is given, run for that many steps) every well formed D.N. from start up to stop, splitting
+# the range into chunks spread over a pool of processes; results stream back in increasing order as chunks finish
+def scan(start: int, stop: int, steps: int = None, processes: int = None,
+         chunk_size: int = 1_000_000) -> Generator[Description, None, None]:
+    chunks = ((a, min(a + chunk_size, stop), steps) for a in range(start, stop, chunk_size))
+    if processes == 1:
+        for chunk in chunks:
+            yield from _scan_chunk(chunk)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for results in pool.imap(_scan_chunk, chunks):
+            yield from results
@@ -7,12 +7,28 @@ A simple Turing Machine implementation aimed at simulating the machines in Turin
 
 from __future__ import annotations
 
-import collections
+import asyncio
+import decimal
+import hashlib
+import itertools
+import mmap
+import os
 import re
+import struct
+import sys
+import tempfile
+import time
+import zlib
 # import typing
-from typing import Union, NamedTuple, Generator
+from typing import TYPE_CHECKING, Union, NamedTuple, Generator, AsyncGenerator, Iterator, Iterable, IO, Callable
+from collections import OrderedDict
+from functools import lru_cache
 from enum import IntEnum
-from copy import deepcopy
+from types import MappingProxyType
+
+# NumPy is only needed by run_batch(), which imports it itself
+if TYPE_CHECKING:
+    import numpy
 # from sys import exit
 
 
@@ -95,7 +111,7 @@ class Behavior(NamedTuple):
         # TBD - Fix to show blanks (quote strings), have choice of arrows, add comment, and omit first arrow <<<
         ops = '' if behavior is None else behavior.ops if len(behavior.ops) > 0 else [N]
         operations = '?' if behavior is None else ','.join(
-            [str(o) if isinstance(o, Step) else _HIGHLIGHT_WRITTEN_FMT.format(o) for o in ops])
+            [_str_move(o) if isinstance(o, int) else _HIGHLIGHT_WRITTEN_FMT.format(o) for o in ops])
         next_m_cfg = '?' if behavior is None else behavior.final_m_config
         comment = ('(Unspecified)' if behavior is None else
                    f"({behavior.comment})" if show_comment and behavior.comment != '' else '')
@@ -105,6 +121,11 @@ class Behavior(NamedTuple):
         return Behavior.str_behavior(self)
 
 
+# A move of one square is shown as L, R or N, and a long move as the direction and the number of squares, e.g. R3
+def _str_move(move: int) -> str:
+    return str(Step(move)) if -1 <= move <= 1 else '{}{}'.format(str(R if move > 0 else L), abs(move))
+
+
 E = ' '     # E for "empty"
 F_SYMBOLS = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
 E_SYMBOLS = list('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
@@ -114,22 +135,114 @@ _HIGHLIGHT_SYMBOL_FMT = "|{}|"  # "\u001b[44m\u001b[37;1m{}\u001b[0m"
 _HIGHLIGHT_M_CONFIG_FMT = _HIGHLIGHT_SYMBOL_FMT   # "\u001b[44m\u001b[37;1m{}\u001b[0m"
 _HIGHLIGHT_ANNOTATION_FMT = "{}"
 _HIGHLIGHT_WRITTEN_FMT = "\u001b[4m{}\u001b[24m"
+_ELISION = '…'  # In place of the squares beyond the edges of a viewport
 
 
 
 InstructionsDict = dict[MConfig, dict[Union[Symbol, tuple[Symbol]], Union[Behavior, tuple]]]
 
 
+# ======== Parsing standard descriptions (S.D.s) and description numbers (D.N.s)
+
+_READ_CHUNK_SIZE = 1 << 16
+
+
+# Decimal digits of n, splitting it in halves by bits and recombining in decimal arithmetic, which (unlike str(n))
+# takes subquadratic time and isn't subject to the limit on the length of int to str conversions
+def _int_to_decimal(n: int) -> str:
+    with decimal.localcontext() as context:
+        context.prec = decimal.MAX_PREC
+        context.Emax = decimal.MAX_EMAX
+        context.traps[decimal.Inexact] = True
+        powers = {}
+
+        def power(w: int) -> decimal.Decimal:
+            if w not in powers:
+                powers[w] = decimal.Decimal(2) ** w
+            return powers[w]
+
+        def inner(n: int, w: int) -> decimal.Decimal:
+            if w <= 3000:
+                return decimal.Decimal(n)
+            half = w >> 1
+            high = n >> half
+            return inner(n - (high << half), half) + inner(high, w - half) * power(half)
+
+        return str(inner(n, n.bit_length()))
+
+
+def _description_chunks(source: Union[int, str, bytes, IO]) -> Iterator[str]:
+    if isinstance(source, int):
+        yield _int_to_decimal(source)
+    elif isinstance(source, (bytes, bytearray)):
+        yield source.decode('latin-1')
+    elif isinstance(source, str):
+        yield source
+    else:
+        for chunk in iter(lambda: source.read(_READ_CHUNK_SIZE), source.read(0)):
+            yield chunk.decode('latin-1') if isinstance(chunk, (bytes, bytearray)) else chunk
+
+
+@lru_cache(maxsize=None)
+def _instruction_pattern(representation: InstructionFormat) -> re.Pattern:
+    chars = FORMAT_CHARS[representation]
+    delimiter = re.escape(chars['symbol_format_fn'](0))
+    m_config = re.escape(chars['m_config_format_fn'](0)[-1])
+    symbol = re.escape(chars['symbol_format_fn'](1)[-1])
+    moves = '|'.join(re.escape(chars['step_format_fn'](move)) for move in (N, R, L))
+    end = re.escape(FORMAT_INSTRUCTION[representation][-1])
+    return re.compile(rf"\s*({delimiter}({m_config}+){delimiter}({symbol}*){delimiter}({symbol}*)({moves})"
+                      rf"{delimiter}({m_config}+)){end}")
+
+
+# The instructions of an S.D. or D.N. (as a string, bytes, int or readable file), one at a time in a single pass, as
+# the indices of their initial m-configuration and scanned and written symbols, their move, the index of their final
+# m-configuration, and their text
+def parse_description(source: Union[int, str, bytes, IO],
+                      representation: InstructionFormat) -> Generator[tuple[int, int, int, Step, int, str], None, None]:
+    if isinstance(source, int):
+        assert representation == 'DN'
+    pattern = _instruction_pattern(representation)
+    move_fmt_fn = FORMAT_CHARS[representation]['step_format_fn']
+    moves = {move_fmt_fn(move): move for move in (N, R, L)}
+    end = FORMAT_INSTRUCTION[representation][-1]
+
+    chunks = _description_chunks(source)
+    buffer, pos, offset = '', 0, 0  # offset is the position in the description of the start of the buffer
+    exhausted = False
+    while True:
+        match = pattern.match(buffer, pos)
+        if match is not None:
+            text, initial, read, written, move, final = match.groups()
+            yield len(initial) - 1, len(read), len(written), moves[move], len(final) - 1, text
+            pos = match.end()
+            continue
+        # Either the next instruction isn't all in the buffer yet, or it is malformed
+        rest = buffer[pos:]
+        if end in rest or exhausted:
+            if exhausted and not rest.strip():
+                return
+            raise BadDescription(rest[:rest.find(end) + 1 or 32], f"Malformed {representation} instruction",
+                                 offset + pos + len(rest) - len(rest.lstrip()))
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+        else:
+            buffer, offset, pos = rest + chunk, offset + pos, 0
+
+
 class Table(object):
     def __init__(self, instructions: Union[InstructionsDict, int, str],
                  e_symbol_ordering: list = None, m_config_ordering: list = None,
-                 add_no_op_instructions: bool = False,
+                 add_no_op_instructions: bool = False, symbol_ordering: list = None,
                  *args, **kw):
 
         if isinstance(instructions, int):
-            instructions = self.dict_from_representation(instructions, 'DN', e_symbol_ordering, m_config_ordering)
+            instructions = self.dict_from_representation(instructions, 'DN', m_config_ordering=m_config_ordering,
+                                                         e_symbol_ordering=e_symbol_ordering)
         elif isinstance(instructions, str):
-            instructions = self.dict_from_representation(instructions, 'SD', e_symbol_ordering, m_config_ordering)
+            instructions = self.dict_from_representation(instructions, 'SD', m_config_ordering=m_config_ordering,
+                                                         e_symbol_ordering=e_symbol_ordering)
 
         # These may turn false in the examination below
         self._is_one_write_max = True
@@ -140,50 +253,72 @@ class Table(object):
         self._is_single_symbol_match = True
         # This optionally enforced below, or may change on examination
         self._is_explicit_configs = True
-        # TBD - Implement <<<
+        # Whether any behavior moves more than one square in one op, given as an int (e.g. 2 for R, R)
         self._is_long_moves = False
+        # Built on demand by compile(), macro(), instructions() and the _format methods; see invalidate()
+        self._compiled = None
+        self._macro_machines = {}
+        self._representations = {}
+        self._m_config_indices = None
+        self._symbol_indices = None
+        self._digest = None
+        self._specialized = None
+        self._warm_steps = None
+        self._plain_steps = 0
+        self._specialized_steps = 0
+        self._specialized_calls = 0
 
         m_configs_from_instructions = list(instructions.keys())
+        m_configs_seen = set(m_configs_from_instructions)
         symbols_from_instructions = {E}
 
         # Go through the instructions and find symbols and m_configs, reorganize to have one symbol match per rule,
         # Determine if _is_standard_form, _is_one_write_max, and thus _is_standard_form
-        # Also make sure every behavior is a Behavior
-        processed_instructions = deepcopy(instructions)
-        for m_config in instructions.keys():
-            for syms in instructions[m_config].keys():
+        # Also make sure every behavior is a Behavior, with its ops as a tuple; the provided dict is left unchanged
+        processed_instructions = {}
+        for m_config, rules in instructions.items():
+            processed_rules = processed_instructions[m_config] = {}
+            expanded_rules = []
+            for syms, rule in rules.items():
                 # Collect all symbols and m-configurations used mentioned in instructions
                 for sym in tuple(syms):
                     symbols_from_instructions.add(sym)
-                behavior = Behavior(*instructions[m_config][syms])
-                processed_instructions[m_config][syms] = behavior
+                behavior = Behavior(*rule)
+                # Ints moving at most one square are Steps; any others are long moves
+                behavior = behavior._replace(ops=tuple(Step(op) if isinstance(op, int) and -1 <= op <= 1 else op
+                                                       for op in behavior.ops))
                 ops = behavior.ops
+                self._is_long_moves = self._is_long_moves or any(
+                    isinstance(op, int) and not isinstance(op, Step) for op in ops)
 
                 self._is_one_write_max = (self._is_one_write_max and
-                                          (sum(map(lambda o: not isinstance(o, Step), ops)) == 0 or
-                                          (sum(map(lambda o: not isinstance(o, Step), ops)) == 1 and
-                                           not isinstance(ops[0], Step))))
+                                          (sum(map(lambda o: not isinstance(o, int), ops)) == 0 or
+                                          (sum(map(lambda o: not isinstance(o, int), ops)) == 1 and
+                                           not isinstance(ops[0], int))))
                 self._is_explicit_write = (self._is_explicit_write and
-                                           len(ops) != 0 and not isinstance(ops[0], Step))
+                                           len(ops) != 0 and not isinstance(ops[0], int))
 
                 self._is_standard_form = (self._is_standard_form and
-                                          len(ops) == 2 and self._is_one_write_max and self._is_explicit_write)
+                                          len(ops) == 2 and self._is_one_write_max and self._is_explicit_write and
+                                          isinstance(ops[1], Step))
 
                 # self._is_standard_form = (self._is_one_write_max and len(ops) == 2 and
                 #                           not isinstance(ops[0], Step) and isinstance(ops[1], Step))
                 for op in ops:
-                    if not isinstance(op, Step):
+                    if not isinstance(op, int):
                         symbols_from_instructions.add(op)
                 final_m_config = behavior.final_m_config
-                if final_m_config not in m_configs_from_instructions:
+                if final_m_config not in m_configs_seen:
                     # Order encountered matters for convention, so append rather than add
                     m_configs_from_instructions.append(final_m_config)
-                # Where multiple read symbols are listed, replace with one rule for each, for ease of later indexing
-                # REV - Decide whether to handle tuples and leave the provided dict unchanged <<<
+                    m_configs_seen.add(final_m_config)
+                # Where multiple read symbols are listed, add one rule for each (after the others), for ease of later
+                # indexing
                 if isinstance(syms, tuple):
-                    for sym in syms:
-                        processed_instructions[m_config][sym] = Behavior(*behavior)
-                    del (processed_instructions[m_config][syms])
+                    expanded_rules.extend((sym, behavior) for sym in syms)
+                else:
+                    processed_rules[syms] = behavior
+            processed_rules.update(expanded_rules)
 
         # !!! - Must be in standard form to work <<<
         # Add any missing no-op rules and expand empty ones (e.g. required for valid Wolfram TuringMachine)
@@ -193,26 +328,31 @@ class Table(object):
             for m_config in processed_instructions.keys():
                 for sym in symbols_from_instructions:
                     if sym not in processed_instructions[m_config].keys():
-                        processed_instructions[m_config][sym] = Behavior([sym, N], m_config, "No-op")
+                        processed_instructions[m_config][sym] = Behavior((sym, N), m_config, "No-op")
                     # TBD - Pythonic way to change just one of the named parameters
                     elif not processed_instructions[m_config][sym].ops:
-                        processed_instructions[m_config][sym] = Behavior([sym, N],
+                        processed_instructions[m_config][sym] = Behavior((sym, N),
                                                                          processed_instructions[
                                                                              m_config][sym].final_m_config,
                                                                          processed_instructions[m_config][sym].comment)
 
-        # REV - Copy necessary?
-        self._instructions = deepcopy(processed_instructions)
+        # Built once and never changed, so a table can be shared by any number of machines (and processes)
+        self._instructions = Table._freeze(processed_instructions)
 
         # Ordering of symbols for various representations (e.g. S.D.)
-        if e_symbol_ordering is None:
+        if symbol_ordering is not None:
+            # A complete ordering, which may include symbols no instruction uses (yet), such as the rest of an alphabet
+            self._symbol_ordering = list(symbol_ordering)
+            assert symbols_from_instructions <= set(self._symbol_ordering), "Ordering of symbols is incomplete"
+        elif e_symbol_ordering is None:
             # Default symbol ordering is sorted
             self._symbol_ordering = sorted(list(symbols_from_instructions))
         else:
             # If E-symbol ordering is blank, sorted F-symbols, provided E-symbol ordering
             self._symbol_ordering = [E] + sorted(
                 filter(lambda s: s in F_SYMBOLS, symbols_from_instructions)) + e_symbol_ordering.copy()
-        assert sorted(self._symbol_ordering) == sorted(symbols_from_instructions), "Ordering of symbols is incomplete"
+        assert symbol_ordering is not None or sorted(self._symbol_ordering) == sorted(
+            symbols_from_instructions), "Ordering of symbols is incomplete"
 
         if m_config_ordering is None:
             # Default m-configuration ordering is as encountered in provided instructions
@@ -223,16 +363,61 @@ class Table(object):
         assert sorted(self._m_config_ordering) == sorted(
             m_configs_from_instructions), "Ordering of m-configs is incomplete"
 
+    # Anything that changes the instructions or orderings invalidates everything derived from them
+    _INVALIDATING_ATTRIBUTES = ('_instructions', '_symbol_ordering', '_m_config_ordering')
+
+    def __setattr__(self, name: str, value: object) -> None:
+        super().__setattr__(name, value)
+        if name in Table._INVALIDATING_ATTRIBUTES:
+            self.invalidate()
+
+    # Discard everything derived from the instructions
+    def invalidate(self) -> None:
+        self._compiled = None
+        self._macro_machines = {}
+        self._representations = {}
+        self._m_config_indices = None
+        self._symbol_indices = None
+        self._digest = None
+        self._specialized = None
+        self._warm_steps = None
+        self._plain_steps = 0
+        self._specialized_steps = 0
+        self._specialized_calls = 0
+
+    # Read only views of the instructions, which can't be changed in place
     @staticmethod
-    def dict_from_representation(instruction_rep: Union[int, str], representation: InstructionFormat,
-                                 m_config_ordering: list = None,
-                                 e_symbol_ordering: list = None, f_symbol_num: int = 2) -> InstructionsDict:
+    def _freeze(instructions: InstructionsDict) -> InstructionsDict:
+        return MappingProxyType({m_config: MappingProxyType(rules) for m_config, rules in instructions.items()})
+
+    # Tables are immutable, so copies can be the table itself, and pickles need only the instructions and orderings
+    def __copy__(self) -> Table:
+        return self
+
+    def __deepcopy__(self, memo: dict) -> Table:
+        return self
+
+    _DERIVED_ATTRIBUTES = ('_compiled', '_macro_machines', '_representations', '_m_config_indices', '_symbol_indices',
+                           '_digest', '_specialized', '_warm_steps', '_plain_steps', '_specialized_steps',
+                           '_specialized_calls')
 
-        if isinstance(instruction_rep, int):
-            assert representation == 'DN'
-            instruction_rep = str(instruction_rep)
+    def __reduce__(self) -> tuple:
+        state = {name: value for name, value in self.__dict__.items() if name not in Table._DERIVED_ATTRIBUTES}
+        state['_instructions'] = {m_config: dict(rules) for m_config, rules in self._instructions.items()}
+        return Table._unpickle, (state,)
 
-        # TBD - Assert valid representation; at least check what symbols are in it.
+    @staticmethod
+    def _unpickle(state: dict) -> Table:
+        table = Table.__new__(Table)
+        state['_instructions'] = Table._freeze(state['_instructions'])
+        for name, value in state.items():
+            setattr(table, name, value)
+        return table
+
+    @staticmethod
+    def dict_from_representation(instruction_rep: Union[int, str, bytes, IO], representation: InstructionFormat,
+                                 m_config_ordering: list = None,
+                                 e_symbol_ordering: list = None, f_symbol_num: int = 2) -> InstructionsDict:
 
         if not e_symbol_ordering:
             e_symbol_ordering = E_SYMBOLS
@@ -242,35 +427,21 @@ class Table(object):
             m_config_fmt_fn = FORMAT_CHARS['tuples']['m_config_format_fn']
         else:
             m_config_fmt_fn = lambda i: m_config_ordering[i]
-        move_fmt_fn = FORMAT_CHARS[representation]['step_format_fn']
-        move_fmt = {move_fmt_fn(i): i for i in [N, R, L]}
-
-        # REV - Find a better way to split up and match each row of the table
-        delimiter = FORMAT_CHARS[representation]['symbol_format_fn'](0)
-        instructions = instruction_rep.split(FORMAT_INSTRUCTION[representation][-1])[:-1]
-        split_instructions = [re.split(delimiter,
-                                       t.replace(move_fmt_fn(N), delimiter+move_fmt_fn(N)
-                                                 ).replace(move_fmt_fn(R), delimiter+move_fmt_fn(R)
-                                                           ).replace(move_fmt_fn(L), delimiter+move_fmt_fn(L)))[1:]
-                              for t in instructions]
 
         instructions_dict = dict()
-        for i, split_rule in enumerate(split_instructions):
-            initial_m_config = m_config_fmt_fn(len(split_rule[0]) - 1)
-            read_symbol = symbol_ordering[len(split_rule[1])]
-            written_symbol = symbol_ordering[len(split_rule[2])]
-            move = move_fmt[split_rule[3]]
-            final_m_config = m_config_fmt_fn(len(split_rule[4]) - 1)
+        for initial, read, written, move, final, text in parse_description(instruction_rep, representation):
+            initial_m_config = m_config_fmt_fn(initial)
             if initial_m_config not in instructions_dict:
                 instructions_dict[initial_m_config] = {}
-            instructions_dict[initial_m_config][read_symbol] = Behavior([written_symbol, move], final_m_config,
-                                                                        instructions[i])
+            instructions_dict[initial_m_config][symbol_ordering[read]] = Behavior([symbol_ordering[written], move],
+                                                                                 m_config_fmt_fn(final), text)
 
-        return deepcopy(instructions_dict)
+        return instructions_dict
 
+    # A copy of the instructions as plain dicts, which can be changed without changing the table
     @property
     def dict(self) -> InstructionsDict:
-        return self._instructions   # REV - Copy? <<<
+        return {m_config: dict(rules) for m_config, rules in self._instructions.items()}
 
     def behavior(self, m_config: MConfig, symbol: Symbol) -> Behavior:
         try:
@@ -293,14 +464,16 @@ class Table(object):
         return FORMAT_CHARS[representation]['separator']
 
     def _format_m_configuration(self, m_config: MConfig, representation: InstructionFormat) -> str:
-        assert m_config in self._m_config_ordering
-        m_config_indices = {m_cfg: pos for pos, m_cfg in enumerate(self._m_config_ordering)}
-        return FORMAT_CHARS[representation]['m_config_format_fn'](m_config_indices[m_config])
+        if self._m_config_indices is None:
+            self._m_config_indices = {m_cfg: pos for pos, m_cfg in enumerate(self._m_config_ordering)}
+        assert m_config in self._m_config_indices
+        return FORMAT_CHARS[representation]['m_config_format_fn'](self._m_config_indices[m_config])
 
     def _format_symbol(self, symbol: Symbol, representation: InstructionFormat) -> str:
-        assert not isinstance(symbol, Step) and symbol in self._symbol_ordering
-        symbol_indices = {sym: pos for pos, sym in enumerate(self._symbol_ordering)}
-        return FORMAT_CHARS[representation]['symbol_format_fn'](symbol_indices[symbol])
+        if self._symbol_indices is None:
+            self._symbol_indices = {sym: pos for pos, sym in enumerate(self._symbol_ordering)}
+        assert not isinstance(symbol, Step) and symbol in self._symbol_indices
+        return FORMAT_CHARS[representation]['symbol_format_fn'](self._symbol_indices[symbol])
 
     def _format_instruction(self, instruction_format: InstructionFormat,
                             m_config_start: MConfig, m_config_end: MConfig,
@@ -381,15 +554,1620 @@ class Table(object):
             if instruction_format not in ['SD', 'DN', 'tuples', 'wolfram'] and table_format in ['string', 'list']:
                 raise NonListableTableFormat(
                     requirement="To represent table as {}, instruction format must be listable ({}) is not listable".format(table_format, instruction_format))
-            if table_format == 'string':
-                return self._instructions_str(instruction_format)
-            if table_format in ['table', 'YAML']:
-                return self._instructions_table(instruction_format)
-            else:
-                return self._instructions_list(instruction_format)
+            # Rendered once per format, until the table changes
+            key = (instruction_format, table_format)
+            if key not in self._representations:
+                if table_format == 'string':
+                    self._representations[key] = self._instructions_str(instruction_format)
+                elif table_format in ['table', 'YAML']:
+                    self._representations[key] = self._instructions_table(instruction_format)
+                else:
+                    self._representations[key] = self._instructions_list(instruction_format)
+            representation = self._representations[key]
+            return representation.copy() if isinstance(representation, list) else representation
         else:
             return self.dict
 
+    # SHA-256 of the instructions and orderings, identifying the table (e.g. in machine checkpoints)
+    @property
+    def digest(self) -> bytes:
+        if self._digest is None:
+            canonical = repr((self._m_config_ordering, self._symbol_ordering,
+                              [(m_config, [(sym, behavior.ops, behavior.final_m_config)
+                                           for sym, behavior in rules.items()])
+                               for m_config, rules in self._instructions.items()]))
+            self._digest = hashlib.sha256(canonical.encode('utf8')).digest()
+        return self._digest
+
+    # The compiled form is built once, on first use, and shared by every machine using this table
+    def compile(self) -> CompiledTable:
+        if self._compiled is None:
+            self._compiled = CompiledTable(self)
+        return self._compiled
+
+    # Macro machines are likewise built on demand, one for each block size, and keep their learned transitions
+    def macro(self, block_size: int = 2) -> MacroMachine:
+        if block_size not in self._macro_machines:
+            self._macro_machines[block_size] = MacroMachine(self, block_size)
+        return self._macro_machines[block_size]
+
+    # Python source for a function running this table, with each m-configuration a function of its own dispatching
+    # inline on the symbols it reads, and its writes, moves and next m-configuration as constants (see _specialized_source)
+    def specialized_source(self) -> str:
+        return _specialized_source(self.compile())
+
+    # The function compiled from specialized_source(), shared by every table with the same digest while it is among
+    # the _SPECIALIZED_CACHE most recently specialized; None for a table too large to write any step inline (see
+    # _specialized_pays), which run() runs faster
+    def specialize(self) -> Union[Callable, None]:
+        if self._specialized is None:
+            run = _SPECIALIZED.pop(self.digest, None)
+            if run is None and not _specialized_pays(self.compile()):
+                run = False
+            elif run is None:
+                namespace = {'sweep': _sweep, 'grow_to': _specialized_grow}
+                exec(compile(self.specialized_source(), '<specialized {}>'.format(self.digest.hex()[:12]), 'exec'),
+                     namespace)
+                run = namespace['run']
+            _SPECIALIZED[self.digest] = run
+            while len(_SPECIALIZED) > _SPECIALIZED_CACHE:
+                _SPECIALIZED.popitem(last=False)
+            self._specialized = run
+        return self._specialized or None
+
+    # Steps plain runs (see TuringMachine.run()) are still to take on this table before they go to its specialized
+    # function: _SPECIALIZE_STEPS for each case it has, so a run that is soon over doesn't wait for it to compile,
+    # and none for a table specialize() gives no function for
+    def _warming(self) -> int:
+        if self._warm_steps is None:
+            compiled = self.compile()
+            self._warm_steps = _SPECIALIZE_STEPS * _specialized_depth(compiled)[1] if _specialized_pays(compiled) else 0
+        return max(0, self._warm_steps - self._plain_steps)
+
+    # Once warm, steps plain runs are still to take by the specialized function before judging whether it pays
+    # them back: as many as warming up took, then 0 while it takes at least _SPECIALIZED_STRIDE steps for each call
+    # into the function for an m-configuration, and None once it doesn't (a machine going round a loop of
+    # m-configurations longer than the steps written inline), after which they are run by run() itself
+    def _probing(self) -> Union[int, None]:
+        if self._specialized_steps < self._warm_steps:
+            return self._warm_steps - self._specialized_steps
+        return 0 if self._specialized_steps >= _SPECIALIZED_STRIDE * self._specialized_calls else None
+
+    # Run this table from initial_m_config on every one of initial_tapes at once, each as TuringMachine.run() would,
+    # in lockstep with NumPy; tapes are strings or lists of symbols, or a 2-D array of indices into compile().symbols
+    def run_batch(self, initial_tapes: Union[list, numpy.ndarray], initial_m_config: MConfig, max_steps: int,
+                  initial_positions: Union[int, numpy.ndarray] = 0) -> BatchResult:
+        import numpy
+
+        compiled = self.compile()
+        symbols = list(compiled.symbols)
+        if isinstance(initial_tapes, numpy.ndarray):
+            tapes = initial_tapes.astype(numpy.uint8)
+            lo = numpy.zeros(len(tapes), dtype=numpy.int64)
+            hi = numpy.full(len(tapes), tapes.shape[1] - 1, dtype=numpy.int64)
+        else:
+            symbol_index = dict(compiled.symbol_index)
+            tapes = numpy.zeros((len(initial_tapes), max(1, max(map(len, initial_tapes), default=1))),
+                                dtype=numpy.uint8)
+            for row, initial_tape in enumerate(initial_tapes):
+                for column, symbol in enumerate(initial_tape):
+                    if symbol not in symbol_index:
+                        symbol_index[symbol] = len(symbols)
+                        symbols.append(symbol)
+                    tapes[row, column] = symbol_index[symbol]
+            lo = numpy.zeros(len(tapes), dtype=numpy.int64)
+            hi = numpy.array([len(t) - 1 for t in initial_tapes], dtype=numpy.int64)
+        if len(symbols) > 256:
+            raise BadToken(requirement="A tape can hold at most 256 distinct symbols")
+        batch = len(tapes)
+        positions = numpy.zeros(batch, dtype=numpy.int64) + initial_positions
+        # Empty tapes have an empty extent until their first square is scanned
+        empty = hi < lo
+        lo[empty], hi[empty] = numpy.iinfo(numpy.int64).max, numpy.iinfo(numpy.int64).min
+        states = numpy.full(batch, compiled.m_config_index.get(initial_m_config, -1), dtype=numpy.int64)
+        steps = numpy.zeros(batch, dtype=numpy.int64)
+        halted = numpy.zeros(batch, dtype=bool)
+
+        # Transition arrays covering every symbol on any tape; a special behavior writes the scanned symbol back (so
+        # doing nothing) in the common update, and then its pattern of writes separately
+        n = len(compiled.m_configs)
+        size = n * len(symbols)
+        write = numpy.zeros(size, dtype=numpy.uint8)
+        move = numpy.zeros(size, dtype=numpy.int64)
+        next_ = numpy.full(size, _HALT, dtype=numpy.int64)
+        patterns = {}
+        for k in range(len(compiled.next)):
+            if compiled.next[k] == _SPECIAL:
+                writes, move[k], next_[k] = compiled.special[k]
+                write[k] = k // n
+                patterns[k] = writes
+            else:
+                write[k], move[k], next_[k] = compiled.write[k], compiled.move[k], compiled.next[k]
+        is_special = numpy.zeros(size, dtype=bool)
+        is_special[list(patterns.keys())] = True
+        offsets = [offset for writes in patterns.values() for offset, _ in writes] + [0]
+        reach_left, reach_right = -min(offsets), max(offsets)
+        stride = max([abs(int(m)) for m in move] + [1])
+
+        # Rows still running, and their state; origin is the position of column 0
+        rows = numpy.flatnonzero(states >= 0)
+        origin = 0
+        run_positions, run_states, run_lo, run_hi = positions[rows], states[rows], lo[rows], hi[rows]
+        halted[states < 0] = True
+        unchecked = 0
+        step = 0
+        for step in range(max_steps):
+            if len(rows) == 0:
+                break
+            if unchecked == 0:
+                # Make sure there is room for the next few steps, then skip checking until that room might run out
+                left = int(run_positions.min()) - origin - reach_left
+                right = tapes.shape[1] - 1 - int(run_positions.max()) + origin - reach_right
+                if left < 0 or right < 0:
+                    grow_left = tapes.shape[1] if left < 0 else 0
+                    grow_right = tapes.shape[1] if right < 0 else 0
+                    grow_left, grow_right = max(grow_left, -left), max(grow_right, -right)
+                    tapes = numpy.pad(tapes, ((0, 0), (grow_left, grow_right)))
+                    origin -= grow_left
+                    left, right = left + grow_left, right + grow_right
+                unchecked = max(1, min(left, right) // stride)
+            unchecked -= 1
+
+            columns = run_positions - origin
+            run_lo = numpy.minimum(run_lo, run_positions)
+            run_hi = numpy.maximum(run_hi, run_positions)
+            k = tapes[rows, columns].astype(numpy.int64) * n + run_states
+            nxt = next_[k]
+            stopping = nxt < 0
+            if stopping.any():
+                done = rows[stopping]
+                positions[done], states[done], lo[done], hi[done] = (run_positions[stopping], run_states[stopping],
+                                                                     run_lo[stopping], run_hi[stopping])
+                steps[done] = step
+                halted[done] = True
+                running = ~stopping
+                rows, columns, k, nxt = rows[running], columns[running], k[running], nxt[running]
+                run_positions, run_states, run_lo, run_hi = (run_positions[running], run_states[running],
+                                                             run_lo[running], run_hi[running])
+            tapes[rows, columns] = write[k]
+            if patterns:
+                special = is_special[k]
+                if special.any():
+                    for pattern_k in numpy.unique(k[special]):
+                        selected = k == pattern_k
+                        for offset, sym in patterns[int(pattern_k)]:
+                            tapes[rows[selected], columns[selected] + offset] = sym
+                            run_lo[selected] = numpy.minimum(run_lo[selected], run_positions[selected] + offset)
+                            run_hi[selected] = numpy.maximum(run_hi[selected], run_positions[selected] + offset)
+            run_positions = run_positions + move[k]
+            run_states = nxt
+        else:
+            step = max_steps
+
+        positions[rows], states[rows], lo[rows], hi[rows] = run_positions, run_states, run_lo, run_hi
+        steps[rows] = step
+        return BatchResult(tapes, origin, positions, states, steps, halted, lo, hi, symbols, compiled.m_configs)
+
+    # An equivalent table: without the m-configurations that can't be reached from initial_m_config; with each
+    # behavior (if fuse, by default only if not in standard form, as fused behaviors aren't) also doing the work of any
+    # that must follow it (the same for every symbol, or the one for a symbol it has just written under the head);
+    # and with each set of equivalent m-configurations merged into one. The optimized table leaves the same symbols
+    # on the tape as this one, for tapes of this table's symbols, though it may scan fewer squares doing so. Also
+    # returns a report of what was saved, including the steps taken by both in a trial run from initial_tape
+    def optimize(self, initial_m_config: MConfig, fuse: bool = None, trial_steps: int = 10_000,
+                 initial_tape: Union[Tape, str] = E) -> tuple[Table, OptimizationReport]:
+        if fuse is None:
+            fuse = not self._is_standard_form
+        instructions = self._instructions
+        reachable = _reachable(instructions, initial_m_config)
+        rules = {m_config: dict(instructions[m_config]) for m_config in reachable if m_config in instructions}
+
+        # Fusing: each behavior is followed through the behaviors that must come after it, taking each m-configuration
+        # at most once so that loops end
+        extra = {}
+        if fuse:
+            for m_config, m_rules in rules.items():
+                for sym, behavior in m_rules.items():
+                    fused, count = _fuse(instructions, self._symbol_ordering, sym, behavior)
+                    if count:
+                        m_rules[sym] = fused
+                        extra[(m_config, sym)] = count
+            reachable = _reachable(rules, initial_m_config)
+            rules = {m_config: m_rules for m_config, m_rules in rules.items() if m_config in reachable}
+
+        # Merging by partition refinement: m-configurations start in blocks by what their rules do, and are split by
+        # the blocks their rules lead to until no block splits; each block is kept as its first m-configuration (or
+        # the initial one)
+        states = [m_config for m_config in self._m_config_ordering if m_config in reachable]
+        signatures = {m_config: tuple((sym, _effect(behavior.ops, sym)) for sym, behavior in
+                                      sorted(rules.get(m_config, {}).items())) for m_config in states}
+        block = _blocks(states, signatures)
+        while True:
+            refined = _blocks(states, {m_config: (block[m_config],) + tuple(
+                block[behavior.final_m_config] for _, behavior in sorted(rules.get(m_config, {}).items()))
+                for m_config in states})
+            if len(set(refined.values())) == len(set(block.values())):
+                break
+            block = refined
+        kept = {}
+        for m_config in [initial_m_config] + states:
+            kept.setdefault(block.get(m_config), m_config)
+        representative = {m_config: kept[block[m_config]] for m_config in states}
+
+        optimized_instructions = {m_config: {sym: behavior._replace(final_m_config=representative[
+            behavior.final_m_config]) for sym, behavior in rules[m_config].items()}
+            for m_config in states if representative[m_config] == m_config and m_config in rules}
+        present = set(optimized_instructions) | {behavior.final_m_config for m_rules in optimized_instructions.values()
+                                                 for behavior in m_rules.values()}
+        optimized = Table(optimized_instructions,
+                          m_config_ordering=[m_config for m_config in self._m_config_ordering if m_config in present],
+                          symbol_ordering=self._symbol_ordering)
+
+        # A trial run of this table, in which each fused behavior taken absorbs the steps it does the work of
+        machine = TuringMachine(initial_m_config, self, initial_tape=initial_tape)
+        compiled = self.compile()
+        taken = []
+        machine.run(trial_steps, lambda entry: taken.append(entry[:3:2]))
+        steps, skip = 0, 0
+        previous = compiled.m_config_index.get(initial_m_config)
+        for state, scanned in taken:
+            if skip:
+                skip -= 1
+            else:
+                steps += 1
+                skip = extra.get((compiled.m_configs[previous], compiled.symbols[scanned]), 0)
+            previous = state
+
+        description = None
+        if self._is_standard_form and optimized._is_standard_form:
+            description = (len(self.instructions('SD', 'string')), len(optimized.instructions('SD', 'string')))
+        return optimized, OptimizationReport(
+            m_configs=(len(self._m_config_ordering), len(optimized._m_config_ordering)),
+            rules=(sum(map(len, self._instructions.values())), sum(map(len, optimized._instructions.values()))),
+            pruned=len(self._m_config_ordering) - len(states), merged=len(states) - len(set(block.values())),
+            fused=sum(m_config in rules for m_config, _ in extra), steps=(len(taken), steps), description=description)
+
+
+class BatchResult(NamedTuple):
+    tapes: numpy.ndarray        # Symbol indices (into symbols) of every tape; column 0 is position origin
+    origin: int
+    positions: numpy.ndarray    # Final head positions
+    states: numpy.ndarray       # Final m-configurations, as indices into m_configs (-1 if the initial one is unknown)
+    steps: numpy.ndarray        # Steps taken by each machine
+    halted: numpy.ndarray       # Whether each machine stopped for want of a rule before max_steps
+    lo: numpy.ndarray           # The extent of squares scanned or written on each tape
+    hi: numpy.ndarray
+    symbols: list[Symbol]
+    m_configs: list[MConfig]
+
+    def m_config(self, row: int) -> MConfig:
+        return self.m_configs[self.states[row]] if self.states[row] >= 0 else None
+
+    # Row's tape as TuringMachine.str_tape() would show it
+    def str_tape(self, row: int) -> str:
+        lo, hi = int(self.lo[row]), max(int(self.hi[row]), int(self.positions[row]))
+        lo = min(lo, hi)
+        cells = self.tapes[row]
+        return ''.join([self.symbols[cells[i]] if 0 <= i < len(cells) else E
+                        for i in range(lo - self.origin, hi + 1 - self.origin)])
+
+
+class OptimizationReport(NamedTuple):
+    m_configs: tuple[int, int]      # Before and after optimization
+    rules: tuple[int, int]
+    pruned: int                     # M-configurations that couldn't be reached
+    merged: int                     # M-configurations merged into an equivalent one
+    fused: int                      # Behaviors that now also do the work of those that follow them
+    steps: tuple[int, int]          # Steps of the trial run, and the steps the optimized table takes to do the same
+    description: tuple[int, int] = None     # Lengths of the S.D.s, if both tables are in standard form
+
+
+# M-configurations reachable from m_config by the rules of instructions (including those with no rules)
+def _reachable(instructions: InstructionsDict, m_config: MConfig) -> set[MConfig]:
+    reached, pending = {m_config}, [m_config]
+    while pending:
+        for behavior in instructions.get(pending.pop(), {}).values():
+            if behavior.final_m_config not in reached:
+                reached.add(behavior.final_m_config)
+                pending.append(behavior.final_m_config)
+    return reached
+
+
+# What ops do, as their writes (offset, symbol), ignoring a write of scanned on the scanned square (which changes
+# nothing), and the displacement of the head
+def _effect(ops: Operations, scanned: Symbol) -> tuple[tuple[tuple[int, Symbol], ...], int]:
+    writes, offset = {}, 0
+    for op in ops:
+        if isinstance(op, int):
+            offset += op
+        else:
+            writes[offset] = op
+    if 0 in writes and writes[0] == scanned:
+        del writes[0]
+    return tuple(sorted(writes.items())), offset
+
+
+# The shortest ops with the given effect, using long moves
+def _effect_ops(writes: tuple[tuple[int, Symbol], ...], displacement: int) -> list[Union[int, Symbol]]:
+    ops, position = [], 0
+    for offset, sym in writes:
+        if offset != position:
+            ops.append(offset - position)
+        ops.append(sym)
+        position = offset
+    if displacement != position:
+        ops.append(displacement - position)
+    return ops
+
+
+# Behavior, taken on scanned, extended by the behaviors that must follow it; returns the fused behavior, and the number
+# of behaviors it now includes beyond its own
+def _fuse(instructions: InstructionsDict, symbols: list[Symbol], scanned: Symbol,
+          behavior: Behavior) -> tuple[Behavior, int]:
+    ops, final = list(behavior.ops), behavior.final_m_config
+    count = 0
+    seen = set()
+    while final in instructions and final not in seen:
+        seen.add(final)
+        writes, offset = _effect(ops, None)
+        writes = dict(writes)
+        under = writes.get(offset, scanned if offset == 0 else None)
+        following = instructions[final]
+        if under is not None:
+            if under not in following:
+                break
+            ops.extend(following[under].ops)
+            final = following[under].final_m_config
+        else:
+            # The behavior for each symbol must do the same thing
+            effects = {(_effect(following[sym].ops, sym), following[sym].final_m_config) if sym in following else None
+                       for sym in symbols}
+            if len(effects) != 1 or None in effects:
+                break
+            (effect, final), = effects
+            ops.extend(_effect_ops(*effect))
+        count += 1
+    # Adjacent moves are made one long move
+    merged = []
+    for op in ops:
+        if isinstance(op, int) and merged and isinstance(merged[-1], int):
+            merged[-1] += op
+        else:
+            merged.append(op)
+    return behavior._replace(ops=tuple(op for op in merged if op != 0), final_m_config=final), count
+
+
+# Numbers m-configurations by their keys, as blocks of those with equal keys
+def _blocks(states: list[MConfig], keys: dict[MConfig, tuple]) -> dict[MConfig, int]:
+    numbers = {}
+    return {m_config: numbers.setdefault(keys[m_config], len(numbers)) for m_config in states}
+
+
+# ======== Tapes
+
+class TwoWayTape(object):
+    """A contiguous tape of one byte per square that grows in both directions.
+
+    Squares hold indices into ``symbols`` (index 0 is the blank), so a zero filled buffer is a blank tape. Positions
+    are absolute; ``_base`` is the position of the first byte of the buffer. The extent is the range of squares that
+    have been scanned or written (as well as any initial squares), and is what is shown when displaying the tape.
+    """
+
+    def __init__(self, symbols: list = None, initial_tape: Union[Tape, str] = (), initial_position: int = 0) -> None:
+        self._symbols = [E] if symbols is None else list(symbols)
+        assert self._symbols[0] == E, "The blank must be the first symbol"
+        self._symbol_index = {sym: i for i, sym in enumerate(self._symbols)}
+        self._cells = bytearray(max(len(initial_tape), 1))
+        self._base = initial_position
+        # Indices into _cells of the extent; empty if _lo > _hi
+        self._lo = 0
+        self._hi = len(initial_tape) - 1
+        for i, symbol in enumerate(initial_tape):
+            self._cells[i] = self.code(symbol)
+
+    def code(self, symbol: Symbol) -> int:
+        try:
+            return self._symbol_index[symbol]
+        except KeyError:
+            if len(self._symbols) == 256:
+                raise BadToken(symbol, requirement="A tape can hold at most 256 distinct symbols")
+            self._symbol_index[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+            return self._symbol_index[symbol]
+
+    @property
+    def symbols(self) -> list[Symbol]:
+        return self._symbols
+
+    # Make sure the buffer covers position, growing it by at least its current size in that direction
+    def _grow(self, position: int) -> None:
+        i = position - self._base
+        if i < 0:
+            grow = max(len(self._cells), -i)
+            self._cells[0:0] = bytes(grow)
+            self._base -= grow
+            self._lo += grow
+            self._hi += grow
+        elif i >= len(self._cells):
+            self._cells.extend(bytes(max(len(self._cells), i - len(self._cells) + 1)))
+
+    # Index of position in the buffer, adding it to the extent
+    def _touch(self, position: int) -> int:
+        i = position - self._base
+        if not 0 <= i < len(self._cells):
+            self._grow(position)
+            i = position - self._base
+        if self._lo > self._hi:
+            self._lo = self._hi = i
+        elif i < self._lo:
+            self._lo = i
+        elif i > self._hi:
+            self._hi = i
+        return i
+
+    # Scanning a square adds it to the extent
+    def __getitem__(self, position: int) -> Symbol:
+        i = self._touch(position)
+        return self._symbols[self._cells[i]]
+
+    def __setitem__(self, position: int, symbol: Symbol) -> None:
+        self.patch_code(position, self.code(symbol))
+
+    # Write the symbol index code at position
+    def patch_code(self, position: int, code: int) -> None:
+        i = self._touch(position)
+        self._cells[i] = code
+
+    # Make the writes of a compiled patch (see CompiledTable.patch), with offsets from position, a slice at a time
+    def patch(self, position: int, patch: tuple[int, int, tuple[tuple[int, int, int, bytes], ...]]) -> None:
+        first, last, slices = patch
+        self._touch(position + first)
+        self._touch(position + last)
+        i = position - self._base
+        for start, stop, stride, codes in slices:
+            self._cells[i + start:i + stop:stride] = codes
+
+    # The symbol at position, without adding it to the extent
+    def peek(self, position: int) -> Symbol:
+        i = position - self._base
+        return self._symbols[self._cells[i]] if 0 <= i < len(self._cells) else E
+
+    # The symbol index at position, without adding it to the extent
+    def peek_code(self, position: int) -> int:
+        i = position - self._base
+        return self._cells[i] if 0 <= i < len(self._cells) else 0
+
+    # First and last positions of the extent (last < first if nothing has been scanned or written)
+    @property
+    def extent(self) -> tuple[int, int]:
+        return self._base + self._lo, self._base + self._hi
+
+    def __len__(self) -> int:
+        return max(0, self._hi - self._lo + 1)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TwoWayTape):
+            return NotImplemented
+        return self.extent == other.extent and str(self) == str(other)
+
+    def copy(self) -> TwoWayTape:
+        return type(self).from_tape(self)
+
+    # A tape of this type holding the same squares as tape; only the extent is copied, as every square outside it
+    # is blank
+    @classmethod
+    def from_tape(cls, tape: TwoWayTape) -> TwoWayTape:
+        copy = cls.__new__(cls)
+        copy._symbols = tape._symbols.copy()
+        copy._symbol_index = tape._symbol_index.copy()
+        lo, hi = (tape._lo, tape._hi) if tape._lo <= tape._hi else (0, -1)
+        with memoryview(tape._cells) as cells:
+            copy._cells = bytearray(cells[lo:hi + 1]) or bytearray(1)
+        copy._base, copy._lo, copy._hi = tape._base + lo, 0, hi - lo
+        return copy
+
+    # Release the buffer; nothing to do for one in memory
+    def close(self) -> None:
+        pass
+
+    # A read only, zero copy view of the symbol indices of squares lo to hi - 1; the view must be released before
+    # the tape next grows
+    def window(self, lo: int, hi: int) -> memoryview:
+        if hi > lo:
+            self._grow(lo)
+            self._grow(hi - 1)
+        return memoryview(self._cells).toreadonly()[max(0, lo - self._base):max(0, hi - self._base)]
+
+    # The symbols of squares lo to hi - 1, without growing the buffer to cover them
+    def squares(self, lo: int, hi: int) -> list[Symbol]:
+        symbols, base = self._symbols, self._base
+        start, stop = max(lo, base), min(hi, base + len(self._cells))
+        if stop <= start:
+            return [E] * max(0, hi - lo)
+        return [E] * (start - lo) + [symbols[c] for c in self._cells[start - base:stop - base]] + [E] * (hi - stop)
+
+    # The symbol indices of squares lo to hi - 1, without growing the buffer to cover them
+    def codes(self, lo: int, hi: int) -> bytes:
+        base = self._base
+        start, stop = max(lo, base), min(hi, base + len(self._cells))
+        if stop <= start:
+            return bytes(max(0, hi - lo))
+        return bytes(start - lo) + bytes(self._cells[start - base:stop - base]) + bytes(hi - stop)
+
+    def str_window(self, lo: int, hi: int) -> str:
+        return ''.join(self.squares(lo, hi))
+
+    def __str__(self) -> str:
+        lo, hi = self.extent
+        return self.str_window(lo, hi + 1)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self)!r}, initial_position={self.extent[0]})"
+
+    # The symbols, the extent and the (compressed) squares in it, as bytes
+    def to_bytes(self) -> bytes:
+        lo, hi = self.extent
+        cells = zlib.compress(bytes(self._cells[self._lo:self._hi + 1]))
+        return (struct.pack('<I', len(self._symbols)) + b''.join(_pack_str(sym) for sym in self._symbols) +
+                struct.pack('<qqQ', lo, hi, len(cells)) + cells)
+
+    # A tape from the bytes written by to_bytes, starting at offset, and the offset of whatever follows them
+    @staticmethod
+    def from_bytes(data: bytes, offset: int = 0) -> tuple[TwoWayTape, int]:
+        count, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        symbols = []
+        for _ in range(count):
+            sym, offset = _unpack_str(data, offset)
+            symbols.append(sym)
+        lo, hi, length = struct.unpack_from('<qqQ', data, offset)
+        offset += 24
+        tape = TwoWayTape(symbols, (), lo)
+        tape._cells = bytearray(zlib.decompress(data[offset:offset + length])) or bytearray(1)
+        tape._hi = hi - lo
+        return tape, offset + length
+
+
+class MMapTape(TwoWayTape):
+    """A TwoWayTape whose buffer is a memory mapped file, for tapes larger than memory.
+
+    The file (a temporary one in directory, or the system default) grows a whole number of pages at a time, by at
+    least its current size, and is sparse where the tape is blank, so only the pages around the head need be in
+    memory. Growing to the left maps a new file, into which only the parts of the old one holding squares are
+    copied, so the new blank squares (and any blank pages of the old file) are never touched.
+    """
+
+    def __init__(self, symbols: list = None, initial_tape: Union[Tape, str] = (), initial_position: int = 0,
+                 directory: str = None) -> None:
+        super().__init__(symbols, initial_tape, initial_position)
+        cells = self._cells
+        self._map(len(cells), directory)
+        _copy_sparse(cells, None, 0, len(cells), self._cells, 0)
+
+    # Only the pages of tape holding its extent are copied, so the copy starts at a page boundary of tape
+    @classmethod
+    def from_tape(cls, tape: TwoWayTape, directory: str = None) -> MMapTape:
+        copy = cls.__new__(cls)
+        copy._symbols = tape._symbols.copy()
+        copy._symbol_index = tape._symbol_index.copy()
+        lo, hi = (tape._lo, tape._hi) if tape._lo <= tape._hi else (0, -1)
+        start = lo - lo % mmap.PAGESIZE
+        copy._base, copy._lo, copy._hi = tape._base + start, lo - start, hi - start
+        copy._map(hi + 1 - start, directory)
+        _copy_sparse(tape._cells, tape._file.fileno() if isinstance(tape, MMapTape) else None, start, hi + 1,
+                     copy._cells, 0)
+        return copy
+
+    # Map a new, blank (so sparse) file of at least size bytes
+    def _map(self, size: int, directory: str) -> None:
+        self._directory = directory
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._file.truncate(self._pages(size))
+        self._cells = mmap.mmap(self._file.fileno(), self._pages(size))
+
+    @staticmethod
+    def _pages(size: int) -> int:
+        return max(1, -(-size // mmap.PAGESIZE)) * mmap.PAGESIZE
+
+    def _grow(self, position: int) -> None:
+        i = position - self._base
+        size = len(self._cells)
+        if i < 0:
+            grow = self._pages(max(size, -i))
+            cells, file = self._cells, self._file
+            self._map(size + grow, self._directory)
+            _copy_sparse(cells, file.fileno(), 0, size, self._cells, grow)
+            cells.close()
+            file.close()
+            self._base -= grow
+            self._lo += grow
+            self._hi += grow
+        elif i >= size:
+            self._cells.resize(size + self._pages(max(size, i - size + 1)))
+
+    def copy(self) -> MMapTape:
+        return MMapTape.from_tape(self, self._directory)
+
+    def close(self) -> None:
+        self._cells.close()
+        self._file.close()
+
+
+_MMAP_COPY_SIZE = 1 << 20
+_SEEK_DATA, _SEEK_HOLE = getattr(os, 'SEEK_DATA', None), getattr(os, 'SEEK_HOLE', None)
+
+
+# Copy bytes start to stop of source to target at offset, a chunk at a time, leaving out blank chunks and (where the
+# system can find them) the holes in fd, the file source maps if any; so blank stretches are neither read nor written
+def _copy_sparse(source: Union[bytearray, mmap.mmap], fd: Union[int, None], start: int, stop: int, target: mmap.mmap,
+                 offset: int) -> None:
+    position = start
+    while position < stop:
+        end = stop
+        if fd is not None and _SEEK_DATA is not None:
+            try:
+                position = os.lseek(fd, position, _SEEK_DATA)
+                end = min(stop, os.lseek(fd, position, _SEEK_HOLE))
+            except OSError:
+                return                                  # Nothing but holes from position on
+        for chunk in range(position, end, _MMAP_COPY_SIZE):
+            codes = source[chunk:min(end, chunk + _MMAP_COPY_SIZE)]
+            if codes.count(0) != len(codes):
+                target[offset + chunk - start:offset + chunk - start + len(codes)] = codes
+        position = end
+
+
+def _pack_str(string: str) -> bytes:
+    encoded = string.encode('utf8')
+    return struct.pack('<I', len(encoded)) + encoded
+
+
+def _unpack_str(data: bytes, offset: int) -> tuple[str, int]:
+    length, = struct.unpack_from('<I', data, offset)
+    return bytes(data[offset + 4:offset + 4 + length]).decode('utf8'), offset + 4 + length
+
+
+# ======== Compiled tables: m-configurations and symbols interned as small integers
+
+# Markers in CompiledTable.next for transitions the fast loop can't take directly
+_HALT = -1      # No rule for this m-configuration and symbol
+_SPECIAL = -2   # Behavior with writes away from the scanned square; see CompiledTable.special
+
+
+class CompiledTable(object):
+    """Flat transition arrays for a Table, indexed by ``symbol * len(m_configs) + m_config``.
+
+    Symbol index 0 is always the blank, so a zero filled buffer is a blank tape. Any behavior that writes at most
+    once, on the scanned square, before moving is reduced to a (write, move, next) triple; anything else is
+    recorded in ``special`` as a tuple of (offset, symbol) writes, a net displacement and the next m-configuration,
+    and in ``patch`` as the same writes grouped into slices (see _patch), to be made a slice assignment at a time.
+    Moves of any number of squares (long moves) are simply added into the offsets and displacement.
+    """
+
+    def __init__(self, table: Table) -> None:
+        self.m_configs = list(table._m_config_ordering)
+        self.m_config_index = {m_config: i for i, m_config in enumerate(self.m_configs)}
+        self.symbols = [E] + [sym for sym in table._symbol_ordering if sym != E]
+        self.symbol_index = {sym: i for i, sym in enumerate(self.symbols)}
+
+        n = len(self.m_configs)
+        size = n * len(self.symbols)
+        # Symbol major, so that a symbol not known to the table indexes past the end rather than into another row
+        self.write = [0] * size
+        self.move = [0] * size
+        self.next = [_HALT] * size
+        self.comment = [''] * size
+        self.special = [None] * size
+        self.patch = [None] * size
+        # Furthest squares to the left and right of the head that any rule writes, and furthest any rule moves it
+        self.reach = (0, 0)
+        self.travel = 0
+        self._instructions = table._instructions
+        self._stopping = {}
+
+        for m_config, rules in table._instructions.items():
+            state = self.m_config_index[m_config]
+            for sym, behavior in rules.items():
+                k = self.symbol_index[sym] * n + state
+                writes = {}
+                offset = 0
+                for op in behavior.ops:
+                    if isinstance(op, int):
+                        offset += op
+                    else:
+                        writes[offset] = self.symbol_index[op]
+                final = self.m_config_index[behavior.final_m_config]
+                self.comment[k] = behavior.comment
+                self.travel = max(self.travel, abs(offset))
+                if set(writes.keys()) <= {0}:
+                    self.write[k] = writes.get(0, self.symbol_index[sym])
+                    self.move[k] = offset
+                    self.next[k] = final
+                else:
+                    self.next[k] = _SPECIAL
+                    self.special[k] = (tuple(writes.items()), offset, final)
+                    self.patch[k] = _patch(writes)
+                    self.reach = (min(self.reach[0], *writes.keys()), max(self.reach[1], *writes.keys()))
+
+    # Copies of next, special and patch in which every rule that leads to one of m_configs or prints one of symbols is
+    # special, along with the set of their indices: run() checks for stopping rules only when it takes a special one,
+    # so stop conditions cost the rules that don't trigger them nothing
+    def stopping(self, m_configs: frozenset[MConfig],
+                 symbols: frozenset[Symbol]) -> tuple[list[int], list[tuple], list[tuple], frozenset[int]]:
+        key = (m_configs, symbols)
+        if key not in self._stopping:
+            n = len(self.m_configs)
+            next_, special, patch = list(self.next), list(self.special), list(self.patch)
+            rules = set()
+            for m_config, rules_ in self._instructions.items():
+                state = self.m_config_index[m_config]
+                for sym, behavior in rules_.items():
+                    if behavior.final_m_config in m_configs or any(
+                            op in symbols for op in behavior.ops if not isinstance(op, int)):
+                        k = self.symbol_index[sym] * n + state
+                        rules.add(k)
+                        if next_[k] != _SPECIAL:
+                            special[k] = (((0, self.write[k]),), self.move[k], next_[k])
+                            patch[k] = _patch({0: self.write[k]})
+                            next_[k] = _SPECIAL
+            self._stopping[key] = (next_, special, patch, frozenset(rules))
+        return self._stopping[key]
+
+
+# Writes (offset -> symbol index) as the offsets of the first and last, and slices (start, stop, stride, symbol
+# indices) of the offsets, each a run of evenly spaced writes (such as a row of F-squares)
+def _patch(writes: dict[int, int]) -> tuple[int, int, tuple[tuple[int, int, int, bytes], ...]]:
+    offsets = sorted(writes)
+    slices = []
+    start = 0
+    while start < len(offsets):
+        stop = start + 1
+        stride = offsets[stop] - offsets[start] if stop < len(offsets) else 1
+        while stop < len(offsets) and offsets[stop] - offsets[stop - 1] == stride:
+            stop += 1
+        slices.append((offsets[start], offsets[stop - 1] + 1, stride, bytes(writes[x] for x in offsets[start:stop])))
+        start = stop
+    return offsets[0], offsets[-1], tuple(slices)
+
+
+# ======== Macro machines: the tape as blocks of squares, with runs of identical blocks crossed in one jump
+
+class MacroTransition(NamedTuple):
+    block: bytes            # The block after the head leaves it
+    final_state: int
+    displacement: int       # From the starting square to the square the head moves to outside the block
+    steps: int              # Steps of the underlying machine taken inside the block
+    first: int              # Offsets within the block of the first and last squares scanned or written
+    last: int
+    last_rule: int          # Index of the last rule taken, for its comment
+
+
+class MacroMachine(object):
+    """A Table viewed as a machine over blocks of ``block_size`` squares, aligned at multiples of the block size.
+
+    A macro transition takes the head from a square in a block to the square outside it where it next arrives,
+    and depends only on the state, the offset of that square in the block, and the contents of the block; each is
+    worked out from the compiled table the first time it is met and remembered. When a transition leaves the state
+    unchanged and moves the head exactly one block along, it is the same transition in every following block with
+    the same contents, so a run of n such blocks is crossed in one jump of n times as many steps.
+
+    Behaviors that write outside the block, halting, or looping forever within a block are left to the compiled
+    machine, one step at a time. Where blocks seldom repeat, so that each transition takes only a few steps and costs
+    far more than run() takes for them, runs are left to run() altogether once the first _MACRO_PROBE transitions
+    have shown it (see _MACRO_STRIDE).
+    """
+
+    def __init__(self, table: Table, block_size: int = 2) -> None:
+        assert block_size > 0
+        self._compiled = table.compile()
+        self.block_size = block_size
+        self._transitions = {}
+        # More steps than this within one block means the machine is looping there
+        self._max_block_steps = len(self._compiled.m_configs) * block_size * len(self._compiled.symbols) ** block_size
+        # Transitions run() has taken (each single step left to the compiled machine counting as one), and the steps
+        # they took, while judging whether they pay
+        self._taken = 0
+        self._taken_steps = 0
+
+    def transition(self, state: int, offset: int, block: bytes) -> Union[MacroTransition, None]:
+        key = (state, offset, block)
+        if key not in self._transitions:
+            self._transitions[key] = self._simulate(state, offset, block)
+        return self._transitions[key]
+
+    def _simulate(self, state: int, offset: int, block: bytes) -> Union[MacroTransition, None]:
+        compiled = self._compiled
+        n = len(compiled.m_configs)
+        cells = bytearray(block)
+        i = offset
+        first = last = offset
+        steps = 0
+        rule = None
+        # The configuration at the last power of two steps, which the machine comes back to if it is looping in the
+        # block, within a few times the length of the loop (Brent's method) and so long before _max_block_steps
+        saved_state, saved_i, saved_cells, check = None, None, None, 1
+        while 0 <= i < self.block_size:
+            first, last = min(first, i), max(last, i)
+            if state == saved_state and i == saved_i and cells == saved_cells:
+                return None
+            if steps == check:
+                saved_state, saved_i, saved_cells, check = state, i, bytes(cells), 2 * check
+            if steps == self._max_block_steps:
+                return None
+            try:
+                rule = cells[i] * n + state
+                nxt = compiled.next[rule]
+            except IndexError:
+                return None
+            if nxt == _HALT:
+                return None
+            elif nxt == _SPECIAL:
+                writes, displacement, nxt = compiled.special[rule]
+                for write_offset, sym in writes:
+                    j = i + write_offset
+                    if not 0 <= j < self.block_size:
+                        return None
+                    cells[j] = sym
+                    first, last = min(first, j), max(last, j)
+                i += displacement
+            else:
+                cells[i] = compiled.write[rule]
+                i += compiled.move[rule]
+            state = nxt
+            steps += 1
+        return MacroTransition(bytes(cells), state, i - offset, steps, first, last, rule)
+
+    # Number of consecutive copies of block in cells, up to limit, starting at index start and going in direction;
+    # cells outside the buffer are blank, so a blank block runs on past its ends
+    @staticmethod
+    def _count_run(cells: bytearray, start: int, block: bytes, limit: int, direction: int) -> int:
+        k = len(block)
+        available = (len(cells) - start) // k if direction > 0 else (start + k) // k
+        bound = min(limit, available)
+        step = k * direction
+        # Short runs are the common case, so check block by block before searching with longer comparisons
+        good = 1
+        i = start + step
+        while good < bound and good < 8:
+            if cells[i:i + k] != block:
+                return good
+            good, i = good + 1, i + step
+        # Then double the run compared, only comparing the blocks not already known to match, then bisect
+        m = 2 * good
+        while m <= bound:
+            lo, hi = (start + good * k, start + m * k) if direction > 0 else (start - (m - 1) * k, start - (good - 1) * k)
+            if cells[lo:hi] != block * (m - good):
+                break
+            good, m = m, 2 * m
+        bad = min(m, bound + 1)
+        while bad - good > 1:
+            mid = (good + bad) // 2
+            lo, hi = ((start + good * k, start + mid * k) if direction > 0 else
+                      (start - (mid - 1) * k, start - (good - 1) * k))
+            good, bad = (mid, bad) if cells[lo:hi] == block * (mid - good) else (good, mid)
+        if good == available and good < limit and not any(block):
+            rest = cells[start + good * k:] if direction > 0 else cells[:start - (good - 1) * k]
+            if not any(rest):
+                good = limit
+        return good
+
+    # Whether taking macro transitions has been found not to pay, so that runs are left to TuringMachine.run()
+    def _unpaying(self) -> bool:
+        return self._taken >= _MACRO_PROBE and self._taken_steps < _MACRO_STRIDE * self._taken
+
+    # Run the machine up to max_steps steps as TuringMachine.run() does, taking macro transitions wherever possible
+    def run(self, machine: TuringMachine, max_steps: int) -> int:
+        compiled = self._compiled
+        m_configs, comments = compiled.m_configs, compiled.comment
+        state = compiled.m_config_index.get(machine._m_configuration)
+        if state is None or self._unpaying():
+            return machine.run(max_steps)
+        # Transitions still to take before judging whether they pay, if that is still to be judged
+        probing = _MACRO_PROBE - self._taken
+        taken = 0
+        transitions = self._transitions
+        tape = machine._tape
+        k = self.block_size
+        steps = 0
+        position = machine._position
+        last_rule = None
+        while steps < max_steps:
+            if taken == probing:
+                break
+            taken += 1
+            start = position - position % k
+            i = start - tape._base
+            if i < 0 or i + k > len(tape._cells):
+                tape._grow(start)
+                tape._grow(start + k - 1)
+                i = start - tape._base
+            cells = tape._cells
+            block = bytes(cells[i:i + k])
+            key = (state, position - start, block)
+            t = transitions[key] if key in transitions else self.transition(*key)
+            if t is None or t.steps > max_steps - steps:
+                # Leave anything that can't be done a block at a time to the compiled machine
+                machine._position = position
+                machine._m_configuration = m_configs[state]
+                if machine.run(1) == 0:
+                    break
+                last_rule = None
+                steps += 1
+                position = machine._position
+                state = compiled.m_config_index[machine._m_configuration]
+                continue
+
+            repeat = 1
+            if t.final_state == state and (t.displacement == k or t.displacement == -k):
+                repeat = self._count_run(cells, i, block, (max_steps - steps) // t.steps, 1 if t.displacement > 0 else -1)
+            # The blocks crossed start from lo to hi and all end up the same
+            lo, hi = (start, start + (repeat - 1) * k) if t.displacement > 0 else (start - (repeat - 1) * k, start)
+            if repeat > 1:
+                tape._grow(lo)
+                tape._grow(hi + k - 1)
+            i = lo - tape._base
+            tape._cells[i:i + repeat * k] = t.block * repeat if repeat > 1 else t.block
+            if tape._lo > tape._hi:
+                tape._lo, tape._hi = i + t.first, i + (hi - lo) + t.last
+            else:
+                if i + t.first < tape._lo:
+                    tape._lo = i + t.first
+                if i + (hi - lo) + t.last > tape._hi:
+                    tape._hi = i + (hi - lo) + t.last
+
+            position += repeat * t.displacement
+            steps += repeat * t.steps
+            machine._step += repeat * t.steps
+            state = t.final_state
+            last_rule = t.last_rule
+
+        machine._position = position
+        machine._m_configuration = m_configs[state]
+        if last_rule is not None:
+            machine._step_comment = comments[last_rule]
+        if probing > 0:
+            self._taken += taken
+            self._taken_steps += steps
+            if taken == probing and steps < max_steps:
+                # The transitions taken while judging them have been judged; carry on as they showed is faster
+                if self._unpaying():
+                    return steps + machine.run(max_steps - steps)
+                return steps + self.run(machine, max_steps - steps)
+        return steps
+
+
+# Macro machines take at least this many transitions before judging whether they pay, which they do by taking at
+# least _MACRO_STRIDE steps for each (as many as run() takes in about the time a transition is looked up)
+_MACRO_PROBE = 1024
+_MACRO_STRIDE = 64
+
+
+# ======== Specialized code: a Python function for each table, with the table written into its code
+
+# Functions compiled from specialized sources, by table digest, least recently specialized first
+_SPECIALIZED = OrderedDict()
+_SPECIALIZED_CACHE = 64
+
+# Moving the buffer's indices along after growing the tape
+_SPECIALIZED_SHIFT = """\
+shift, base, cells = base - tape._base, tape._base, tape._cells
+i, lo, hi, size = i + shift, lo + shift, hi + shift, len(cells)"""
+
+# The variables a specialized function keeps its place in, passed to and returned from the function for each
+# m-configuration (see _specialized_source)
+_SPECIALIZED_LOCALS = 'cells, base, lo, hi, size, i, steps, last'
+
+
+# The expression for the buffer index offset squares from the head
+def _specialized_index(offset: int) -> str:
+    return 'i' if offset == 0 else 'i + {}'.format(offset) if offset > 0 else 'i - {}'.format(-offset)
+
+
+def _specialized_indent(lines: list[str], spaces: int = 4) -> str:
+    return '\n'.join(' ' * spaces + line for line in '\n'.join(lines).splitlines())
+
+
+# The code for rule k, which leads from state
+def _specialized_rule(compiled: CompiledTable, state: int, code: int, k: int) -> list[str]:
+    lines = []
+    nxt = compiled.next[k]
+    if nxt == _SPECIAL:
+        _, displacement, nxt = compiled.special[k]
+        first, last, slices = compiled.patch[k]
+        # Only writes left of the head can fall off the start of the buffer, and only writes right of it the end
+        ends = ([first] if first < 0 else []) + ([last] if last > 0 else [])
+        if ends:
+            lines.append('if {}:'.format(' or '.join(
+                '{} {}'.format(_specialized_index(offset), '< 0' if offset < 0 else '>= size') for offset in ends)))
+            lines.extend('    grow(base + {})'.format(_specialized_index(offset)) for offset in ends)
+            lines.extend('    ' + line for line in _SPECIALIZED_SHIFT.splitlines())
+        for start, stop, stride, codes in slices:
+            if stop - start == 1:
+                lines.append('cells[{}] = {}'.format(_specialized_index(start), codes[0]))
+            else:
+                lines.append('cells[{}:{}{}] = {!r}'.format(_specialized_index(start), _specialized_index(stop),
+                                                            ':{}'.format(stride) if stride != 1 else '', codes))
+        if first < 0:
+            lines.append('if {0} < lo:\n    lo = {0}'.format(_specialized_index(first)))
+        if last > 0:
+            lines.append('if {0} > hi:\n    hi = {0}'.format(_specialized_index(last)))
+    else:
+        displacement = compiled.move[k]
+        if compiled.write[k] != code:
+            lines.append('cells[i] = {}'.format(compiled.write[k]))
+    if displacement:
+        lines.append('i {} {}'.format('+=' if displacement > 0 else '-=', abs(displacement)))
+    lines.append('last = {}'.format(k))
+    return lines
+
+
+# The symbols on which each rule of state only moves the head the same number of squares and stays in state, by that
+# number; a run of squares holding them (every so many squares) is a sweep, crossed in one go
+def _specialized_sweeps(compiled: CompiledTable, state: int) -> dict[int, list[int]]:
+    n = len(compiled.m_configs)
+    sweeps = {}
+    for code in range(len(compiled.symbols)):
+        k = code * n + state
+        if compiled.next[k] == state and compiled.write[k] == code and compiled.move[k]:
+            sweeps.setdefault(compiled.move[k], []).append(code)
+    return sweeps
+
+
+# The code for a rule crossing the sweep of state by displacement (as many steps as the sweep is long, up to the
+# limit), leaving the last rule taken that of the last square crossed
+def _specialized_sweep(compiled: CompiledTable, state: int, displacement: int, codes: list[int]) -> list[str]:
+    n = len(compiled.m_configs)
+    end = ('size if limit < 0 else min(size, i + {} * (limit - steps))' if displacement > 0 else
+           '-1 if limit < 0 else max(-1, i - {} * (limit - steps))').format(abs(displacement))
+    run = 'sweep(cells, i, {}, {}, {!r})'.format(end, displacement, bytes(codes))
+    return ['j = i {} {} * ({} - 1)'.format('+' if displacement > 0 else '-', abs(displacement), run),
+            'if j {} {}:'.format(*('>', 'hi') if displacement > 0 else ('<', 'lo')),
+            '    {} = j'.format('hi' if displacement > 0 else 'lo'),
+            'steps += {}'.format(('j - i' if displacement > 0 else 'i - j') if abs(displacement) == 1 else
+                                 '({}) // {}'.format('j - i' if displacement > 0 else 'i - j', abs(displacement))),
+            'last = cells[j] * {} + {}'.format(n, state),
+            'i = j {} {}'.format('+' if displacement > 0 else '-', abs(displacement))]
+
+
+# The number of squares in a row, every displacement squares from index i of cells up to (but not including) end,
+# holding any of codes; looked at a chunk at a time, the chunks doubling, so in time in proportion to the run found
+def _sweep(cells: Union[bytearray, mmap.mmap], i: int, end: int, displacement: int, codes: bytes) -> int:
+    found, chunk = 0, 16
+    while True:
+        stop = min(end, i + chunk * displacement) if displacement > 0 else max(end, i + chunk * displacement)
+        squares = cells[i:stop if stop >= 0 else None:displacement]
+        run = len(squares) - len(squares.lstrip(codes))
+        found += run
+        if run < len(squares) or stop == end:
+            return found
+        i, chunk = stop, chunk * 2
+
+
+# The buffer, its start position, the extent indices into it, its size and the head index, once the tape has grown to
+# take in the square the head is on
+def _specialized_grow(tape: TwoWayTape, base: int, lo: int, hi: int, i: int) -> tuple:
+    tape._grow(base + i)
+    shift = base - tape._base
+    return tape._cells, tape._base, lo + shift, hi + shift, len(tape._cells), i + shift
+
+
+# Checks of the head against the extent, growing the tape, after a move right and after a move left
+_SPECIALIZED_RIGHT = """\
+if i > hi:
+    hi = i
+    if i >= size:
+        cells, base, lo, hi, size, i = grow_to(tape, base, lo, hi, i)"""
+_SPECIALIZED_LEFT = """\
+if i < lo:
+    lo = i
+    if i < 0:
+        cells, base, lo, hi, size, i = grow_to(tape, base, lo, hi, i)"""
+
+
+# The cases making up the code for a step of state, inside the function for root. Each rule counts its step, returns
+# the complement of the state it leads to if that was the last step to take, and checks the head against the extent
+# in the direction it moved; then a rule leading back to root carries on with its loop, and one leading elsewhere
+# goes on to the code for the next step written inline, depth times over, and after that returns the state it leads
+# to. The complement of state is returned when no rule applies
+def _specialized_step(compiled: CompiledTable, root: int, state: int, depth: int) -> list[str]:
+    n = len(compiled.m_configs)
+    sweeps = _specialized_sweeps(compiled, state)
+    swept = {code: displacement for displacement, codes in sweeps.items() for code in codes}
+    lines = ['sym = cells[i]']
+    for code, sym in enumerate(compiled.symbols):
+        k = code * n + state
+        nxt = compiled.next[k]
+        if nxt == _HALT:
+            continue
+        if code in swept:
+            rule, nxt, displacement = (_specialized_sweep(compiled, state, swept[code], sweeps[swept[code]]), state,
+                                       swept[code])
+        elif nxt == _SPECIAL:
+            rule = _specialized_rule(compiled, state, code, k)
+            _, displacement, nxt = compiled.special[k]
+            first, final, _ = compiled.patch[k]
+            if first <= displacement <= final:
+                # The head lands among the squares just written, so in the extent already
+                displacement = 0
+        else:
+            rule, displacement = _specialized_rule(compiled, state, code, k), compiled.move[k]
+        rule.extend(['steps += 1', 'if steps == limit:', '    state = {}'.format(~nxt), '    break'])
+        if displacement:
+            rule.extend((_SPECIALIZED_RIGHT if displacement > 0 else _SPECIALIZED_LEFT).splitlines())
+        if nxt == root:
+            rule.append('continue')
+        elif depth:
+            rule.extend(_specialized_step(compiled, root, nxt, depth - 1))
+        else:
+            rule.extend(['state = {}'.format(nxt), 'break'])
+        lines.append('{} sym == {}:  # {!r}\n{}'.format('elif' if len(lines) > 1 else 'if', code, sym,
+                                                        _specialized_indent(rule)))
+    halt = 'state = {}\nbreak'.format(~state)
+    lines.append('else:\n' + _specialized_indent([halt]) if len(lines) > 1 else halt)
+    return lines
+
+
+# The depth to which _specialized_step writes the steps after each rule inline, and about how many cases it writes
+# in all: as deep as it goes with at most _SPECIALIZED_CASES cases (and at most _SPECIALIZED_DEPTH), so that small
+# tables run through several m-configurations without leaving one function, while large ones are not written out
+# many times over
+def _specialized_depth(compiled: CompiledTable) -> tuple[int, int]:
+    n = len(compiled.m_configs)
+    rules = [[compiled.special[k][2] if compiled.next[k] == _SPECIAL else compiled.next[k]
+              for k in range(state, len(compiled.next), n) if compiled.next[k] != _HALT] for state in range(n)]
+
+    # The cases written for a step of state in the function for root, and for the steps after it up to depth deep
+    # (those back in root carry on with its loop instead), or None once there would be more than limit
+    def cases(root: int, state: int, depth: int, limit: int) -> Union[int, None]:
+        found = len(rules[state])
+        for nxt in rules[state] if depth else ():
+            if nxt != root:
+                deeper = cases(root, nxt, depth - 1, limit - found)
+                if deeper is None:
+                    return None
+                found += deeper
+            if found > limit:
+                return None
+        return found if found <= limit else None
+
+    depth, written = 0, sum(len(following) for following in rules)
+    while depth < _SPECIALIZED_DEPTH:
+        deeper = 0
+        for root in range(n):
+            more = cases(root, root, depth + 1, _SPECIALIZED_CASES - deeper)
+            if more is None:
+                return depth, written
+            deeper += more
+        if deeper == written:
+            # Every step written leads back to the m-configuration it is written in, or no rule applies, so writing
+            # more deeply writes nothing more
+            return _SPECIALIZED_DEPTH, written
+        depth, written = depth + 1, deeper
+    return depth, written
+
+
+# Whether the function specialized for a table runs it faster than run(): each step from one m-configuration to
+# another that is not written inline is a call, which costs more than a step of run(), so only once the steps after
+# each rule can be written inline (see _specialized_depth)
+def _specialized_pays(compiled: CompiledTable) -> bool:
+    return _specialized_depth(compiled)[0] > 0
+
+
+# The source of a function run(tape, state, i, max_steps) that takes up to max_steps steps (or until no rule applies,
+# if None) from m-configuration index state with the head at index i of the tape's buffer, exactly as
+# TuringMachine.run() would; it returns the steps taken, the new head position and state, the index of the last
+# rule taken (-1 if none), and the calls it made into the functions for m-configurations. Each m-configuration is a
+# function of its own, looked up by state in a list, which loops while the machine stays in it (or comes back to it
+# within the steps written inline, see _specialized_step) and returns the state to carry on from, or its complement
+# to stop, so a step costs the same however many m-configurations the table has. Each step dispatches on the symbol
+# scanned to code for each rule with its writes, move and next state as constants (and omitted when they change
+# nothing). Rules that only move the head and stay in the same m-configuration cross whole sweeps of the squares they
+# apply to in one go (see _specialized_sweep), so a machine shuttling back and forth over its tape takes most of its
+# steps many at a time
+def _specialized_source(compiled: CompiledTable) -> str:
+    depth, _ = _specialized_depth(compiled)
+    functions = [_SPECIALIZED_STATE.format(state=state, m_config=m_config, locals=_SPECIALIZED_LOCALS,
+                                           body=_specialized_indent(_specialized_step(compiled, state, state, depth), 8))
+                 for state, m_config in enumerate(compiled.m_configs)]
+    return """\
+def run(tape, state, i, max_steps):
+    if max_steps == 0:
+        return 0, tape._base + i, state, -1, 0
+    cells, base, lo, hi, size = tape._cells, tape._base, tape._lo, tape._hi, len(tape._cells)
+    grow = tape._grow
+    limit = -1 if max_steps is None else max_steps
+    steps = 0
+    last = -1
+    calls = 0
+{functions}
+    states = [{states}]
+{reach}
+    while state >= 0:
+        state, {locals} = states[state]({locals})
+        calls += 1
+    tape._lo, tape._hi = lo, hi
+    return steps, base + i, ~state, last, calls
+""".format(functions=_specialized_indent(functions), locals=_SPECIALIZED_LOCALS,
+           reach=_specialized_indent([_SPECIALIZED_RIGHT, 'el' + _SPECIALIZED_LEFT]),
+           states=', '.join('s{}'.format(state) for state in range(len(compiled.m_configs))))
+
+
+# The function for one m-configuration in the source of _specialized_source
+_SPECIALIZED_STATE = """\
+def s{state}({locals}):  # {m_config!r}
+    while True:
+{body}
+    return state, {locals}
+"""
+
+# Limits on the code _specialized_source writes inline (see _specialized_depth)
+_SPECIALIZED_CASES = 4096
+_SPECIALIZED_DEPTH = 4
+
+# Plain runs of a table take this many steps for each case its specialized function has before they go to that
+# function, about as long as compiling it takes (see Table._warming())
+_SPECIALIZE_STEPS = 2048
+
+# Calling the function for an m-configuration costs about as much as this many steps taken inline, so plain runs
+# only stay with a specialized function that takes at least as many between calls (see Table._probing())
+_SPECIALIZED_STRIDE = 8
+
+
+# ======== Detecting halting and non-terminating machines as they run
+
+class Termination(NamedTuple):
+    kind: str           # 'halted', 'cycle' or 'translated cycle'; or, for a stop condition given to run() or
+                        # steps(), 'm-config', 'symbol' or 'cells'
+    step: int           # Step at which the machine halted or stopped, or at which the configuration that first repeats
+                        # was reached (for translated cycles, one at which the repeating pattern had been reached)
+    period: int = 0     # Steps between repetitions
+    shift: int = 0      # Squares the repeating pattern moves along the tape each period (for translated cycles)
+
+
+# Rolling hashes are polynomials in _HASH_BASE, with the position of each square as the exponent of its term
+_HASH_MODULUS = (1 << 61) - 1
+_HASH_BASE = 1_000_003
+
+
+class _DriftWatch(object):
+    """Watches for a translated cycle moving in one direction, in coordinates x = direction * position.
+
+    A record is a step at which the head arrives further along than at any earlier record, with nothing beyond it
+    ever scanned or written, so that everything past it is blank. If two records, a checkpoint at x1 and a later one
+    at x2 = x1 + delta, are in the same state, and the squares from the lowest m touched in between up to the head
+    are the same at both, shifted by delta, then everything from the second record on repeats everything from the
+    first, shifted by delta, forever.
+
+    The comparison uses hashes kept up to date in O(1) amortized time per step: ``frozen`` is the hash of the squares
+    below m (unchanged since the checkpoint) and ``middle`` is the hash of the squares from m to m + delta.
+    Checkpoints are chosen as in Brent's cycle detection, at records 1, 2, 4, 8, ... since the previous one.
+    """
+
+    def __init__(self, detector: LoopDetector, direction: int, furthest: int) -> None:
+        self.detector = detector
+        self.direction = direction
+        self.furthest = furthest
+        self.latest = None  # Position of the latest record
+        self.state = None   # m-configuration at the checkpoint; None until the first record
+        self.power, self.count = 1, 0
+
+    def code(self, x: int) -> int:
+        return self.detector.code(self.direction * x)
+
+    # Squares about to be scanned or written, before anything is written
+    def touch(self, x: int) -> None:
+        if x > self.furthest:
+            self.furthest = x
+        if self.state is not None and x < self.low:
+            power = self.detector.power
+            for y in range(x, self.low):
+                term = self.code(y) * power(y)
+                self.frozen -= term
+                self.middle += term
+            for y in range(x + self.delta, self.low + self.delta):
+                self.middle -= self.code(y) * power(y)
+            self.low = x
+
+    def write(self, x: int, change: int) -> None:
+        if self.state is not None and self.low <= x < self.low + self.delta:
+            self.middle += change
+
+    def checkpoint(self, x: int, m_config: MConfig, step: int, total: int) -> None:
+        self.state, self.x1, self.step1, self.total1 = m_config, x, step, total
+        self.low, self.frozen, self.middle, self.delta = x, total - self.code(x) * self.detector.power(x), 0, 0
+        self.content = self.detector.content()
+
+    def is_record(self, x: int) -> bool:
+        return x >= self.furthest and (self.latest is None or x > self.latest)
+
+    def record(self, x: int, m_config: MConfig, step: int, total: int) -> Union[Termination, None]:
+        self.furthest = self.latest = x
+        if self.state is None:
+            self.checkpoint(x, m_config, step, total)
+            return None
+        power = self.detector.power
+        for y in range(self.low + self.delta, self.low + x - self.x1):
+            self.middle += self.code(y) * power(y)
+        self.delta = x - self.x1
+        self.count += 1
+        if (m_config == self.state and
+                (total - self.frozen - self.middle - (self.total1 - self.frozen) * power(self.delta)) % _HASH_MODULUS
+                == 0 and self.verify(x)):
+            return Termination('translated cycle', self.step1, step - self.step1, self.direction * self.delta)
+        if self.count == self.power:
+            self.checkpoint(x, m_config, step, total)
+            self.power *= 2
+            self.count = 0
+        return None
+
+    # Compare the squares directly, since equal hashes are only very nearly certain
+    def verify(self, x2: int) -> bool:
+        if self.direction > 0:
+            first, second = (self.low, self.x1 + 1), (self.low + self.delta, x2 + 1)
+        else:
+            first, second = (-self.x1, 1 - self.low), (-x2, 1 - self.low - self.delta)
+        return (LoopDetector.segment(self.content, *first) ==
+                LoopDetector.segment(self.detector.content(), *second))
+
+
+class LoopDetector(object):
+    """Steps a machine, watching for it halting, cycling, or cycling while drifting along the tape.
+
+    An exact cycle is found with Brent's algorithm, comparing the state, head position and a rolling hash of the
+    tape against a checkpoint taken at steps 1, 2, 4, 8, ... since the previous one; translated cycles are found by a
+    _DriftWatch in each direction. Each step costs O(1) amortized time, and any cycle is found within a few periods
+    of the step at which it starts. Candidates are confirmed by comparing the tape itself with a copy made at the
+    checkpoint, so a reported cycle is certain. The step at which an exact cycle starts is then found as in the second
+    phase of Brent's algorithm, by replaying the machine from where the detector started, twice, a period apart.
+    """
+
+    def __init__(self, machine: TuringMachine) -> None:
+        self._machine = machine
+        self._start = machine.branch(machine._table)
+        self._powers = {}
+        tape = machine._tape
+        lo, hi = tape.extent
+        if hi < lo:
+            lo = hi = machine._position
+        # Hashes of the whole tape, in each orientation
+        self._totals = {1: 0, -1: 0}
+        for position in range(lo, hi + 1):
+            for direction in (1, -1):
+                self._totals[direction] += self.code(position) * self.power(direction * position)
+        self._drifts = [_DriftWatch(self, direction, max(direction * lo, direction * hi,
+                                                         direction * machine._position))
+                        for direction in (1, -1)]
+        self._checkpoint(machine._step)
+        self._power, self._count = 1, 0
+        self.termination = None
+
+    def power(self, exponent: int) -> int:
+        try:
+            return self._powers[exponent]
+        except KeyError:
+            self._powers[exponent] = pow(_HASH_BASE, exponent, _HASH_MODULUS)
+            return self._powers[exponent]
+
+    def code(self, position: int) -> int:
+        tape = self._machine._tape
+        i = position - tape._base
+        return tape._cells[i] if 0 <= i < len(tape._cells) else 0
+
+    # The non-blank part of the tape (the machine's, by default), as its first position and its symbol indices
+    def content(self, tape: TwoWayTape = None) -> tuple[int, bytes]:
+        tape = self._machine._tape if tape is None else tape
+        cells = bytes(tape._cells)
+        content = cells.strip(b'\0')
+        return tape._base + len(cells) - len(cells.lstrip(b'\0')) if content else 0, content
+
+    @staticmethod
+    def segment(content: tuple[int, bytes], lo: int, hi: int) -> bytes:
+        start, cells = content
+        return (bytes(max(0, min(hi, start) - lo)) + cells[max(0, lo - start):max(0, hi - start)] +
+                bytes(max(0, hi - max(lo, start + len(cells)))))
+
+    def _key(self) -> tuple:
+        return self._machine._m_configuration, self._machine._position, self._totals[1]
+
+    # The first step of the cycle of period steps: of two replays from the start, the second period steps ahead, the
+    # step at which they first are in the same configuration
+    def _cycle_start(self, period: int) -> int:
+        trail, lead = self._start.branch(self._start._table), self._start.branch(self._start._table)
+        lead.run(period)
+        while (trail._m_configuration, trail._position) != (lead._m_configuration, lead._position) or self.content(
+                trail._tape) != self.content(lead._tape):
+            trail.step()
+            lead.step()
+        trail._tape.close()
+        lead._tape.close()
+        return trail._step
+
+    def _checkpoint(self, step: int) -> None:
+        self._checkpoint_key, self._checkpoint_step = self._key(), step
+        self._checkpoint_content = self.content()
+
+    # Take one step of the machine; returns how it terminates once that is known, and None until then
+    def step(self, debug: bool = False) -> Union[Termination, None]:
+        machine, compiled = self._machine, self._machine._table.compile()
+        position, m_config, step = machine._position, machine._m_configuration, machine._step
+
+        # Work out what the step will write before taking it
+        writes = []
+        state = compiled.m_config_index.get(m_config)
+        scanned = self.code(position)
+        rule = None if state is None else scanned * len(compiled.m_configs) + state
+        if rule is not None and rule < len(compiled.next):
+            if compiled.next[rule] >= 0:
+                writes = [(position, compiled.write[rule])]
+            elif compiled.next[rule] == _SPECIAL:
+                writes = [(position + offset, sym) for offset, sym in compiled.special[rule][0]]
+        for drift in self._drifts:
+            drift.touch(drift.direction * position)
+            for written, _ in writes:
+                drift.touch(drift.direction * written)
+        changes = [(written, sym - self.code(written)) for written, sym in writes if sym != self.code(written)]
+
+        machine.step(debug)
+        if machine._step == step:
+            self.termination = Termination('halted', step)
+            return self.termination
+
+        for written, change in changes:
+            for drift in self._drifts:
+                x = drift.direction * written
+                term = change * self.power(x)
+                self._totals[drift.direction] = (self._totals[drift.direction] + term) % _HASH_MODULUS
+                drift.write(x, term)
+        if not changes and machine._position == position and machine._m_configuration == m_config:
+            self.termination = Termination('cycle', step, 1)
+            return self.termination
+
+        # Exact cycles
+        self._count += 1
+        if (self._key() == self._checkpoint_key and
+                self.content() == self._checkpoint_content):
+            self.termination = Termination('cycle', self._cycle_start(self._count), self._count)
+            return self.termination
+        if self._count == self._power:
+            self._checkpoint(machine._step)
+            self._power *= 2
+            self._count = 0
+
+        # Translated cycles
+        for drift in self._drifts:
+            x = drift.direction * machine._position
+            if drift.is_record(x):
+                self.termination = drift.record(x, machine._m_configuration, machine._step,
+                                                self._totals[drift.direction])
+                if self.termination is not None:
+                    return self.termination
+        return None
+
+
+# ======== Rendering
+
+class TapeRenderer(object):
+    """The squares of a machine's tape last shown, rendered as a list of symbols, kept between calls and patched after
+    single steps.
+
+    One step can only change the squares within the compiled table's reach of the head position before it, so only
+    those, and any squares newly shown at either end, are rendered again; anything else (a reset, a run of many steps)
+    renders everything shown. Only the squares shown are kept, so a frame costs time in proportion to its width, not
+    to the length of the tape.
+    """
+
+    def __init__(self, machine: TuringMachine) -> None:
+        self._machine = machine
+        self._tape = None
+        self._step = self._position = self._lo = None
+        self._squares = []
+
+    # The symbols of squares lo to hi (inclusive), as a new list
+    def squares(self, lo: int, hi: int) -> list[Symbol]:
+        machine = self._machine
+        tape = machine._tape
+        if (self._tape is not tape or machine._step not in (self._step, self._step + 1) or
+                hi < self._lo or lo >= self._lo + len(self._squares)):
+            self._tape, self._lo, self._squares = tape, lo, tape.squares(lo, hi + 1)
+        else:
+            if machine._step == self._step + 1:
+                reach_lo, reach_hi = machine._table.compile().reach
+                start = max(self._lo, self._position + reach_lo)
+                stop = min(self._lo + len(self._squares), self._position + reach_hi + 1)
+                if start < stop:
+                    self._squares[start - self._lo:stop - self._lo] = tape.squares(start, stop)
+            # Keep just the squares shown
+            if lo > self._lo:
+                del self._squares[:lo - self._lo]
+                self._lo = lo
+            del self._squares[hi - self._lo + 1:]
+            if lo < self._lo:
+                self._squares[0:0] = tape.squares(lo, self._lo)
+                self._lo = lo
+            if hi >= self._lo + len(self._squares):
+                self._squares.extend(tape.squares(self._lo + len(self._squares), hi + 1))
+        self._step, self._position = machine._step, machine._position
+        return list(self._squares)
+
+
+# ======== Configuration snapshots
+
+class Configuration(object):
+    """An immutable snapshot of a machine's complete configuration at one step, as yielded by steps(snapshots=True).
+
+    Rather than a copy of the tape, each snapshot holds the squares its step changed and a link to the previous
+    snapshot; a full copy of the tape (a keyframe) is kept only once the changes, or the snapshots, since the last one
+    add up to the size of that one, so a history costs memory in proportion to the changes made (or, for a machine
+    that mostly moves, to the number of snapshots), and rebuilding the tape of any snapshot costs time in proportion
+    to the size of the tape.
+    """
+
+    __slots__ = ('_step', '_m_configuration', '_position', '_step_comment', '_extent', '_changes', '_previous',
+                 '_keyframe', '_since_keyframe', '_depth', '_keyframe_size')
+
+    def __init__(self, machine: TuringMachine, changes: tuple = (), previous: Configuration = None) -> None:
+        self._step, self._m_configuration, self._position = machine._step, machine._m_configuration, machine._position
+        self._step_comment = machine._step_comment
+        self._extent = machine._tape.extent
+        self._changes, self._previous = changes, previous
+        self._since_keyframe = len(changes) + (0 if previous is None else previous._since_keyframe)
+        self._depth = 0 if previous is None else previous._depth + 1
+        if previous is None or max(self._since_keyframe, self._depth) >= max(64, previous._keyframe_size):
+            self._keyframe, self._changes, self._previous = machine._tape.copy(), (), None
+            self._since_keyframe = self._depth = 0
+            self._keyframe_size = len(self._keyframe)
+        else:
+            self._keyframe, self._keyframe_size = None, previous._keyframe_size
+
+    @property
+    def step(self) -> int:
+        return self._step
+
+    @property
+    def m_configuration(self) -> MConfig:
+        return self._m_configuration
+
+    @property
+    def position(self) -> int:
+        return self._position
+
+    @property
+    def step_comment(self) -> str:
+        return self._step_comment
+
+    # A new copy of the tape as it was at this step
+    @property
+    def tape(self) -> TwoWayTape:
+        chain = []
+        configuration = self
+        while configuration._keyframe is None:
+            chain.append(configuration._changes)
+            configuration = configuration._previous
+        tape = configuration._keyframe.copy()
+        for changes in reversed(chain):
+            for position, code in changes:
+                tape.patch_code(position, code)
+        lo, hi = self._extent
+        if hi < lo:
+            tape._lo, tape._hi = 0, -1
+        else:
+            tape._grow(lo)
+            tape._grow(hi)
+            tape._lo, tape._hi = lo - tape._base, hi - tape._base
+        return tape
+
+    def str_tape(self) -> str:
+        return str(self.tape)
+
+    def str_complete_configuration(self) -> str:
+        tape = self.tape
+        lo, hi = tape.extent
+        lo, hi = (self._position, self._position) if hi < lo else (min(lo, self._position), max(hi, self._position))
+        return tape.str_window(lo, self._position) + self._m_configuration + tape.str_window(self._position, hi + 1)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(step={self._step}, {self.str_complete_configuration()!r})"
+
 
 # ======== A simple Turing machine class
 
@@ -397,63 +2175,128 @@ class TuringMachine(object):
 
     def __init__(self, initial_m_configuration: MConfig, instructions: Union[InstructionsDict, Table],
                  initial_tape: Union[Tape, str] = E, initial_position: int = 0,
+                 tape_backend: Callable[[TwoWayTape], TwoWayTape] = None,
                  *args, **kw):
 
         # Process alternate forms for arguments (tape a string, tuple for matched symbols with same behavior)
-        # REV - Lots of deepcopy which may not be needed
         if isinstance(initial_tape, str):
             initial_tape = list(initial_tape)
 
-        # Store the Tape internally as a dict
-        self._dict_initial_tape = collections.defaultdict(lambda: E)
-        for position, symbol in enumerate(initial_tape):
-            self._dict_initial_tape[position] = symbol
         self._initial_m_configuration = initial_m_configuration
-        # REV - Copy necessary?
+        # Tables are immutable, so one is shared by every machine using it
         if isinstance(instructions, Table):
-            self._table = deepcopy(instructions)
+            self._table = instructions
         else:
             self._table = Table(instructions)
         # TBD - Add ability to set other than defaults with optional arguments
         self._initial_position = initial_position
 
+        # Store the Tape internally as a TwoWayTape sharing the symbol indices of the compiled table; the working tape
+        # is made from it by tape_backend (e.g. MMapTape.from_tape, for a tape on disk)
+        self._initial_tape = TwoWayTape(self._table.compile().symbols, initial_tape)
+        self._tape_backend = TwoWayTape.from_tape if tape_backend is None else tape_backend
+
         # TBD - Way to not have to repeat this (and avoid errors about setting outside of __init__?
         # self.reset()
-        self._tape = self._dict_initial_tape.copy()
+        self._tape = self._tape_backend(self._initial_tape)
         self._m_configuration = self._initial_m_configuration
         self._position = self._initial_position
         self._step = 0
         self._step_comment = "Initial configuration"
+        self._termination = None
+        self._renderer = TapeRenderer(self)
+        # The figures figures() has read off the tape so far, and the F-square after the last; kept with the tape
+        # they were read from, so they are read again from the start of any other (e.g. after reset())
+        self._figures_tape = None
+        self._figures_square = None
+        self._figures_found = None
 
     def reset(self) -> None:
-        self._tape = self._dict_initial_tape.copy()
+        self._tape.close()
+        self._tape = self._tape_backend(self._initial_tape)
         self._m_configuration = self._initial_m_configuration
         self._position = self._initial_position
         self._step = 0
         self._step_comment = "Initial configuration"
-
+        self._termination = None
+
+    # A new machine in the same complete configuration (and at the same step) as this one, but following instructions
+    def branch(self, instructions: Union[InstructionsDict, Table]) -> TuringMachine:
+        machine = TuringMachine(self._m_configuration, instructions, initial_position=self._position,
+                                tape_backend=self._tape_backend)
+        lo, hi = self._tape.extent
+        machine._initial_tape = TwoWayTape(machine._table.compile().symbols, self._tape.str_window(lo, hi + 1), lo)
+        machine._tape.close()
+        machine._tape = machine._tape_backend(machine._initial_tape)
+        machine._step = self._step
+        return machine
+
+    # First and last positions shown when displaying the tape: everything scanned or written, and the head if it is
+    # to the right of that (or, for complete configurations, to the left)
+    # REV - Is Turing's omission of the final blank intentional? - https://cs.stackexchange.com/q/128346/1210
+    def _tape_bounds(self, include_head: bool = False) -> tuple[int, int]:
+        lo, hi = self._tape.extent
+        if hi < lo:
+            return self._position, self._position
+        return min(lo, self._position) if include_head else lo, max(hi, self._position)
+
+    # The first position shown and the symbols shown: everything, as in complete configurations, or at most width
+    # squares around the head, with elision markers at any edge beyond which there is more; width is at least 3, so
+    # that the markers never take the place of the head
+    def _shown_squares(self, width: int = None) -> tuple[int, list[Symbol]]:
+        lo, hi = self._tape_bounds(include_head=True)
+        if width is None or width >= hi - lo + 1:
+            return lo, self._renderer.squares(lo, hi)
+        width = max(width, 3)
+        view_lo = max(lo, min(self._position - (width - 1) // 2, hi - width + 1))
+        squares = self._renderer.squares(view_lo, view_lo + width - 1)
+        if view_lo > lo:
+            squares[0] = _ELISION
+        if view_lo + width - 1 < hi:
+            squares[-1] = _ELISION
+        return view_lo, squares
+
+    # The symbols on the squares str_tape() shows, one for each square (however many characters a symbol has)
     @property
     def tape(self) -> Tape:
-        list_tape = []
-        # REV - Is Turing's omission of the final blank intentional? - https://cs.stackexchange.com/q/128346/1210
-        for i in range(min(self._tape.keys()), 1+max(self._position, max(self._tape.keys()))):
-            list_tape.append(self._tape[i])
-        return list_tape
+        lo, hi = self._tape_bounds()
+        return self._tape.squares(lo, hi + 1)
 
     @property
     def step_comment(self) -> str:
         return self._step_comment
 
+    # How the machine was found to halt or repeat by steps(auto_halt=True); None if not (yet) known
+    @property
+    def termination(self) -> Union[Termination, None]:
+        return self._termination
+
     def complete_configuration(self) -> CompleteConfig:
-        list_tape = self.tape
-        list_tape.insert(self._position, self._m_configuration)
+        lo, list_tape = self._shown_squares()
+        list_tape.insert(self._position - lo, self._m_configuration)
         return list_tape
 
-    def str_tape(self) -> str:
-        return ''.join([str(elem) for elem in self.tape])
+    # A read only, zero copy view of the symbol indices (into tape_symbols) of squares lo to hi - 1
+    def tape_window(self, lo: int, hi: int) -> memoryview:
+        return self._tape.window(lo, hi)
 
-    def str_complete_configuration(self) -> str:
-        return ''.join([str(elem) for elem in self.complete_configuration()])
+    @property
+    def tape_symbols(self) -> list[Symbol]:
+        return self._tape.symbols
+
+    # The tape as a string, or just the squares lo to hi - 1 if given
+    def str_tape(self, lo: int = None, hi: int = None) -> str:
+        if lo is None or hi is None:
+            tape_lo, tape_hi = self._tape_bounds()
+            lo = tape_lo if lo is None else lo
+            hi = tape_hi + 1 if hi is None else hi
+        return self._tape.str_window(lo, hi)
+
+    # The complete configuration as a string, or just the part of it within width squares around the head
+    def str_complete_configuration(self, width: int = None) -> str:
+        lo, squares = self._shown_squares(width)
+        position = self._position - lo
+        return ''.join(squares[:position]) + self._m_configuration + ''.join(squares[position:])
 
     def instructions(self, instruction_format: InstructionFormat = None,
                      table_format: str = 'string') -> Union[InstructionsDict, list, str]:
@@ -466,7 +2309,7 @@ class TuringMachine(object):
                      show_step: bool = False,  # step_pad: tuple = (10, '0'),
                      symbol_highlight: str = None, m_config_highlight: str = None, annotations_highlight: str = None,
                      show_behavior: bool = False, show_comments: bool = False,
-                     ) -> str:
+                     width: int = None) -> str:
         if symbol_highlight is None and m_config_highlight is None:
             symbol_highlight = _HIGHLIGHT_SYMBOL_FMT
             m_config_highlight = _HIGHLIGHT_M_CONFIG_FMT
@@ -476,66 +2319,499 @@ class TuringMachine(object):
         if annotations_highlight is None:
             annotations_highlight = _HIGHLIGHT_ANNOTATION_FMT
 
-        tape_txt = list(self.str_tape())
+        # Only the squares that may have changed since the last call are rendered again; see TapeRenderer
+        lo, tape_txt = self._shown_squares(width)
+        position = self._position - lo
         # m_config_txt = [' '] * len(tape_txt)
-        tape_txt[self._position] = symbol_highlight.format(tape_txt[self._position])
+        tape_txt[position] = symbol_highlight.format(tape_txt[position])
         # m_config_txt[self._position] = m_config_highlight.format(self._m_configuration)
 
 
         step_behavior = None
         try:
-            step_behavior = self._table.behavior(self._m_configuration, self._tape[self._position])
+            step_behavior = self._table.behavior(self._m_configuration, self._tape.peek(self._position))
         except (UnknownMConfig, UnknownSymbol):
             pass
 
         rule_txt = annotations_highlight.format(Behavior.str_behavior(step_behavior, show_comments)) if show_behavior else ''
-        m_config_txt = ' ' * self._position + m_config_highlight.format(self._m_configuration) + rule_txt
+        m_config_txt = ' ' * position + m_config_highlight.format(self._m_configuration) + rule_txt
         display_lines = [''.join(tape_txt), ''.join(m_config_txt)]
         if show_step:
             # display_lines.insert(0, annotations_highlight.format(str(self._step).rjust(*step_pad)))
-            display_lines.insert(0, ' ' * self._position + annotations_highlight.format(str(self._step)))
+            display_lines.insert(0, ' ' * position + annotations_highlight.format(str(self._step)))
         return '\n'.join(display_lines)
 
+    # Take one step by the table's compiled transitions, making all the writes of a behavior at once, from its patch
     def step(self, debug: bool = False) -> None:
+        compiled = self._table.compile()
+        tape = self._tape
+        state = compiled.m_config_index.get(self._m_configuration)
+        i = tape._touch(self._position)
         try:
-            behavior = self._table.behavior(self._m_configuration, self._tape[self._position])
-            for op in behavior.ops:
-                if isinstance(op, Step):
-                    self._position += op
-                else:
-                    self._tape[self._position] = op
-            self._m_configuration = behavior.final_m_config
-            self._step_comment = behavior.comment
-            self._step += 1
-        except (UnknownMConfig, UnknownSymbol) as e:
+            k = tape._cells[i] * len(compiled.m_configs) + state
+            nxt = compiled.next[k]
+        except (TypeError, IndexError):
+            nxt = _HALT
+        if nxt == _HALT:
             if debug:
-                raise e
-
-    # Sequential states of the machine, starting with the current state and leaving the machine in the last state
+                # Raises UnknownMConfig or UnknownSymbol
+                self._table.behavior(self._m_configuration, tape.symbols[tape._cells[i]])
+            return
+        if nxt == _SPECIAL:
+            _, displacement, nxt = compiled.special[k]
+            tape.patch(self._position, compiled.patch[k])
+            self._position += displacement
+        else:
+            tape._cells[i] = compiled.write[k]
+            self._position += compiled.move[k]
+        self._m_configuration = compiled.m_configs[nxt]
+        self._step_comment = compiled.comment[k]
+        self._step += 1
+
+    # Run up to max_steps steps (all steps until no rule applies if None) using the table's compiled transitions,
+    # leaving the machine in the same complete configuration as the equivalent calls to step(); returns steps taken.
+    # If given, trace is called after each step with a tuple of the index (into compile().m_configs) of the new
+    # m-configuration, the new head position, and the indices (into tape_symbols) of the symbol scanned and of the
+    # symbol left on the scanned square. Also stops after a step into any of stop_m_configs or printing any of
+    # stop_symbols, or before a step that would scan or write a square making the tape more than max_cells long
+    # (see _too_long), recording why in termination (which is otherwise cleared when any of these is given). Without
+    # any of these, runs go to the function specialized for the table (see run_specialized()) once the table has
+    # taken enough steps to repay compiling it (see Table._warming()), for as long as it keeps paying (see
+    # Table._probing())
+    def run(self, max_steps: int = None, trace: Callable[[tuple[int, int, int, int]], None] = None,
+            stop_m_configs: Iterable[MConfig] = None, stop_symbols: Iterable[Symbol] = None,
+            max_cells: int = None) -> int:
+        plain = trace is None and stop_m_configs is None and stop_symbols is None and max_cells is None
+        if plain and max_steps != 0:
+            warming = self._table._warming()
+            if warming == 0:
+                run = self._table.specialize()
+                probing = None if run is None else self._table._probing()
+                if probing == 0 or probing is not None and max_steps is not None and max_steps <= probing:
+                    return self._run_specialized(run, max_steps)
+                if probing is not None:
+                    steps = self._run_specialized(run, probing)
+                    if steps < probing:
+                        return steps
+                    return steps + TuringMachine.run(self, None if max_steps is None else max_steps - steps)
+            elif max_steps is None or max_steps > warming:
+                steps = TuringMachine.run(self, warming)
+                if steps < warming:
+                    return steps
+                return steps + TuringMachine.run(self, None if max_steps is None else max_steps - steps)
+        compiled = self._table.compile()
+        state = compiled.m_config_index.get(self._m_configuration)
+        stopping = stop_m_configs is not None or stop_symbols is not None
+        if stopping or max_cells is not None:
+            self._termination = None
+        if max_steps == 0:
+            return 0
+        tape = self._tape
+        if state is None or len(tape) == 0:
+            # Scanning the square is all that happens when there is no rule for the m-configuration
+            tape._touch(self._position)
+            if state is None:
+                return 0
+        n = len(compiled.m_configs)
+        write, move, next_ = compiled.write, compiled.move, compiled.next
+        special, patch = compiled.special, compiled.patch
+        stops = ()
+        if stopping:
+            stop_m_configs = frozenset(stop_m_configs or ())
+            next_, special, patch, stops = compiled.stopping(stop_m_configs, frozenset(stop_symbols or ()))
+        # The tape would be too long once hi - lo reached width (see _too_long)
+        limited = max_cells is not None
+        width = max_cells if limited else sys.maxsize
+
+        # Work directly on the tape's buffer; symbols unknown to the table have indices past the end of the transition
+        # arrays, so reading one halts just as in step(). Indices are into the buffer, which starts at position base.
+        cells, base = tape._cells, tape._base
+        lo, hi = tape._lo, tape._hi
+        i = self._position - base
+
+        steps = 0
+        last = None
+        stopped = None
+        for steps in range(max_steps) if max_steps is not None else itertools.count():
+            if i < lo:
+                if limited and _too_long(lo, hi, i, i, width):
+                    stopped = 'cells'
+                    break
+                if i < 0:
+                    tape._grow(base + i)
+                    shift, base, cells = base - tape._base, tape._base, tape._cells
+                    i, lo, hi = i + shift, lo + shift, hi + shift
+                lo = i
+            elif i > hi:
+                if limited and _too_long(lo, hi, i, i, width):
+                    stopped = 'cells'
+                    break
+                if i >= len(cells):
+                    tape._grow(base + i)
+                    cells = tape._cells
+                hi = i
+            try:
+                k = cells[i] * n + state
+                nxt = next_[k]
+            except IndexError:
+                break
+            if nxt < 0:
+                if nxt == _HALT:
+                    break
+                _, displacement, nxt = special[k]
+                first, final, slices = patch[k]
+                if limited and (i + first < lo or i + final > hi) and _too_long(lo, hi, i + first, i + final, width):
+                    stopped = 'cells'
+                    break
+                if i + first < 0 or i + final >= len(cells):
+                    tape._grow(base + i + first)
+                    tape._grow(base + i + final)
+                    shift, base, cells = base - tape._base, tape._base, tape._cells
+                    i, lo, hi = i + shift, lo + shift, hi + shift
+                for start, stop, stride, codes in slices:
+                    cells[i + start:i + stop:stride] = codes
+                if i + first < lo:
+                    lo = i + first
+                if i + final > hi:
+                    hi = i + final
+                written = cells[i]
+                i += displacement
+                if k in stops:
+                    # The step that triggers a stop condition is taken, then the run ends
+                    state = nxt
+                    last = k
+                    if trace is not None:
+                        trace((state, base + i, k // n, written))
+                    stopped = 'm-config' if compiled.m_configs[nxt] in stop_m_configs else 'symbol'
+                    steps += 1
+                    break
+            else:
+                written = cells[i] = write[k]
+                i += move[k]
+            state = nxt
+            last = k
+            if trace is not None:
+                trace((state, base + i, k // n, written))
+        else:
+            steps = max_steps
+
+        tape._lo, tape._hi = lo, hi
+        self._position = base + i
+        if steps:
+            self._m_configuration = compiled.m_configs[state]
+            self._step_comment = compiled.comment[last]
+            self._step += steps
+        if stopped is not None:
+            self._termination = Termination(stopped, self._step)
+        if plain:
+            self._table._plain_steps += steps
+        return steps
+
+    # Run up to max_steps steps (until the machine halts if None) as run() does, chunk steps at a time, yielding the
+    # machine after each chunk and letting the event loop run other tasks before the next, so any number of machines
+    # can run side by side, taking turns a chunk at a time; stops early once max_seconds have passed. Cancelling the
+    # consuming task leaves the machine in the configuration reached by the last whole chunk
+    async def asteps(self, max_steps: int = None, chunk: int = 10_000,
+                     max_seconds: float = None) -> AsyncGenerator[TuringMachine, None]:
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
+        taken = 0
+        while max_steps is None or taken < max_steps:
+            size = chunk if max_steps is None else min(chunk, max_steps - taken)
+            ran = self.run(size)
+            taken += ran
+            yield self
+            if ran < size or (deadline is not None and time.monotonic() >= deadline):
+                return
+            await asyncio.sleep(0)
+
+    # As asteps(), without the intermediate configurations; returns the steps taken
+    async def arun(self, max_steps: int = None, chunk: int = 10_000, max_seconds: float = None) -> int:
+        start = self._step
+        async for _ in self.asteps(max_steps, chunk, max_seconds):
+            pass
+        return self._step - start
+
+    # Run up to max_steps steps as run() does (without trace or stop conditions), by the function specialized for the
+    # table (see Table.specialize()), which crosses sweeps over runs of squares many steps at a time; by run() itself
+    # for tables specializing does not speed up. Raises InstrumentedMachine rather than skip the instrumented step()
+    # or run() a Profiler has put on the machine
+    def run_specialized(self, max_steps: int = None) -> int:
+        self._check_uninstrumented()
+        run = self._table.specialize()
+        if run is None:
+            return self.run(max_steps)
+        return self._run_specialized(run, max_steps)
+
+    def _run_specialized(self, run: Callable, max_steps: int = None) -> int:
+        compiled = self._table.compile()
+        state = compiled.m_config_index.get(self._m_configuration)
+        if max_steps == 0:
+            return 0
+        tape = self._tape
+        if state is None or len(tape) == 0:
+            tape._touch(self._position)
+            if state is None:
+                return 0
+        steps, self._position, state, last, calls = run(tape, state, self._position - tape._base, max_steps)
+        self._table._specialized_steps += steps
+        self._table._specialized_calls += calls
+        if steps:
+            self._m_configuration = compiled.m_configs[state]
+            self._step_comment = compiled.comment[last]
+            self._step += steps
+        return steps
+
+    # Run up to max_steps steps as run() does, but crossing runs of identical blocks of block_size squares in one jump.
+    # Raises InstrumentedMachine, as run_specialized() does
+    def run_macro(self, max_steps: int, block_size: int = 2) -> int:
+        self._check_uninstrumented()
+        return self._table.macro(block_size).run(self, max_steps)
+
+    # Fast paths that bypass step() and run() refuse to run a machine a Profiler has instrumented these on
+    def _check_uninstrumented(self) -> None:
+        if 'run' in vars(self) or 'step' in vars(self):
+            raise InstrumentedMachine(requirement="run() or step() is instrumented (e.g. by a Profiler); use run()")
+
+    # The sequence the machine computes: the figures on its F-squares (every other square, starting from the initial
+    # position), left to right, each yielded once the machine has written it (other symbols on F-squares, such as
+    # Turing's ə, are skipped); by Turing's convention figures on F-squares are never changed, so a blank F-square
+    # means the sequence so far has all been yielded. Each call yields the sequence from its start, but figures read
+    # by earlier calls are remembered rather than read again, and reading carries on from the F-square after the
+    # last. Runs from the current configuration in compiled chunks, which double up to _FIGURES_CHUNK steps but are
+    # kept to about as many steps as the remaining figures should need, stopping after n figures, max_steps steps, or
+    # once the machine halts
+    def figures(self, n: int = None, max_steps: int = None) -> Generator[Symbol, None, None]:
+        if n == 0:
+            return
+        tape = self._tape
+        if self._figures_tape is not tape:
+            self._figures_tape, self._figures_square, self._figures_found = tape, self._initial_position, []
+        found = self._figures_found
+        yield from found[:n]
+        if n is not None and len(found) >= n:
+            return
+        steps = 0
+        chunk = 1
+        while True:
+            symbol = tape.peek(self._figures_square)
+            while symbol != E:
+                self._figures_square += 2
+                if symbol in ('0', '1'):
+                    found.append(symbol)
+                    yield symbol
+                    if len(found) == n:
+                        return
+                symbol = tape.peek(self._figures_square)
+            if n is not None and found:
+                chunk = min(chunk, max(1, (n - len(found)) * self._step // len(found)))
+            if max_steps is not None:
+                chunk = min(chunk, max_steps - steps)
+            if chunk == 0:
+                return
+            taken = self.run(chunk)
+            steps += taken
+            if taken < chunk:
+                # Halted; collect whatever the last chunk wrote, then stop
+                max_steps = steps
+            chunk = min(2 * chunk, _FIGURES_CHUNK)
+
+    # Index into the compiled arrays of the rule the next step takes, or None if the machine has halted
+    def _next_rule(self) -> Union[int, None]:
+        compiled = self._table.compile()
+        state = compiled.m_config_index.get(self._m_configuration)
+        k = None if state is None else self._tape.peek_code(self._position) * len(compiled.m_configs) + state
+        if k is None or k >= len(compiled.next) or compiled.next[k] == _HALT:
+            return None
+        return k
+
+    # Squares the next step may write
+    def _step_squares(self) -> tuple[int, ...]:
+        k = self._next_rule()
+        if k is None:
+            return ()
+        compiled = self._table.compile()
+        if compiled.next[k] == _SPECIAL:
+            return tuple(self._position + offset for offset, _ in compiled.special[k][0])
+        return self._position,
+
+    # One step, as run() takes it with the stop conditions given, but through step() (or detector); returns the
+    # termination, if the step triggered one (or, if the tape is already too long, if it was not taken)
+    def _checked_step(self, detector: Union[LoopDetector, None], debug: bool, stop_m_configs: frozenset[MConfig],
+                      stop_symbols: frozenset[Symbol], max_cells: Union[int, None]) -> Union[Termination, None]:
+        if max_cells is not None:
+            # As in run(), scanning the square is checked first, then any writes beside it
+            lo, hi = self._tape.extent
+            if _too_long(lo, hi, self._position, self._position, max_cells):
+                return Termination('cells', self._step)
+            self._tape._touch(self._position)
+            k = self._next_rule()
+            compiled = self._table.compile()
+            if k is not None and compiled.next[k] == _SPECIAL:
+                first, last, _ = compiled.patch[k]
+                lo, hi = self._tape.extent
+                if _too_long(lo, hi, self._position + first, self._position + last, max_cells):
+                    return Termination('cells', self._step)
+        stops = ()
+        if stop_m_configs or stop_symbols:
+            *_, stops = self._table.compile().stopping(stop_m_configs, stop_symbols)
+        k = self._next_rule() if stops else None
+        if detector is not None:
+            termination = detector.step(debug)
+            if termination is not None:
+                return termination
+        else:
+            self.step(debug)
+        if k in stops:
+            return Termination('m-config' if self._m_configuration in stop_m_configs else 'symbol', self._step)
+        return None
+
+    # Sequential states of the machine, starting with the current state and leaving the machine in the last state,
+    # or (if snapshots) immutable Configurations of each state, sharing everything but the changes each step made;
+    # if checkpoint is a file name, the machine is saved to it every checkpoint_steps steps (counted from the
+    # initial configuration) and/or every checkpoint_seconds seconds, and when the steps end. States are yielded
+    # every stride steps, and the steps end (with the state reached) once any of the stop conditions of run() is
+    # met, as recorded in termination; unless auto_halt or debug, the steps between are taken by run(), without
+    # returning to the caller
     def steps(self, steps: int = None, include_current: bool = True, reset: bool = True, extend: bool = False,
-              auto_halt: bool = False, debug: bool = False) -> Generator[TuringMachine, None, None]:
+              auto_halt: bool = False, debug: bool = False,
+              checkpoint: str = None, checkpoint_steps: int = None, checkpoint_seconds: float = None,
+              snapshots: bool = False, stride: int = 1,
+              stop_m_configs: Iterable[MConfig] = None, stop_symbols: Iterable[Symbol] = None,
+              max_cells: int = None) -> Generator[Union[TuringMachine, Configuration], None, None]:
         if extend:
             reset = False
             include_current = False
         step = 0
         if reset:
             self.reset()
+        conditions = stop_m_configs is not None or stop_symbols is not None or max_cells is not None
+        stop_m_configs, stop_symbols = frozenset(stop_m_configs or ()), frozenset(stop_symbols or ())
+        if conditions or auto_halt:
+            self._termination = None
+        fast = (stride > 1 or conditions) and not (auto_halt or debug)
+        snapshot = Configuration(self) if snapshots else None
+        yielded = None
         if include_current:
-            yield self
+            yield snapshot if snapshots else self
+            yielded = self._step
             step += 1
+        detector = LoopDetector(self) if auto_halt else None
+        saved, saved_step = time.monotonic(), self._step
+        termination = None
         while steps is None or step < steps:
-            self._prev_tape = self._tape
-            self._prev_m_configuration = self._m_configuration
-            self._prev_position = self._position
-            self.step(debug)
-            # Stop generating steps if the complete configuration has not changed
-            if auto_halt:
-                if (self._prev_tape == self._tape and
-                        self._prev_m_configuration == self._m_configuration and
-                        self._prev_position == self._position):
-                    return
-            yield self
+            if fast:
+                if snapshots:
+                    # Only squares within stride steps' travel (and reach) of the head can change
+                    compiled = self._table.compile()
+                    lo = self._position - stride * compiled.travel + compiled.reach[0]
+                    hi = self._position + stride * compiled.travel + compiled.reach[1] + 1
+                    before = self._tape.codes(lo, hi)
+                self.run(stride, stop_m_configs=stop_m_configs if conditions else None, stop_symbols=stop_symbols,
+                         max_cells=max_cells)
+                termination = self._termination if conditions else None
+                if snapshots:
+                    after = self._tape.codes(lo, hi)
+                    snapshot = Configuration(self, tuple((lo + x, code) for x, (code, old) in enumerate(zip(after, before))
+                                                         if code != old), snapshot)
+            else:
+                for _ in range(stride):
+                    if snapshots:
+                        squares = self._step_squares()
+                        before = [self._tape.peek_code(x) for x in squares]
+                    if conditions:
+                        termination = self._checked_step(detector, debug, stop_m_configs, stop_symbols, max_cells)
+                    elif auto_halt:
+                        termination = detector.step(debug)
+                    else:
+                        self.step(debug)
+                    if termination is not None:
+                        self._termination = termination
+                        # Stop generating steps once the machine halts or is known to repeat itself
+                        if termination.kind not in _STOP_KINDS:
+                            break
+                    if snapshots:
+                        after = [self._tape.peek_code(x) for x in squares]
+                        snapshot = Configuration(self, tuple((x, code) for x, code, old in zip(squares, after, before)
+                                                             if code != old), snapshot)
+                    if termination is not None:
+                        break
+                if termination is not None and termination.kind not in _STOP_KINDS:
+                    break
+            if checkpoint is not None and (
+                    (checkpoint_steps and self._step // checkpoint_steps != saved_step // checkpoint_steps) or
+                    (checkpoint_seconds is not None and time.monotonic() - saved >= checkpoint_seconds)):
+                self.save(checkpoint)
+                saved, saved_step = time.monotonic(), self._step
+            if termination is not None and self._step == yielded:
+                # Stopped before taking a step, in the state already yielded
+                break
+            yield snapshot if snapshots else self
+            yielded = self._step
             step += 1
+            if termination is not None:
+                break
+        if checkpoint is not None:
+            self.save(checkpoint)
+
+    # Save the complete configuration, step, and initial configuration, along with the digest of the table, as bytes
+    # to a binary file (replaced atomically if given by name)
+    def save(self, file: Union[str, IO]) -> None:
+        data = b''.join([_CHECKPOINT_MAGIC, self._table.digest,
+                         struct.pack('<Qq', self._step, self._position),
+                         _pack_str(self._m_configuration), _pack_str(self._step_comment),
+                         _pack_str(self._initial_m_configuration), struct.pack('<q', self._initial_position),
+                         self._tape.to_bytes(), self._initial_tape.to_bytes()])
+        if isinstance(file, str):
+            with open(file + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(file + '.tmp', file)
+        else:
+            file.write(data)
+
+    # A machine following instructions, which must be the table the machine was saved with, restored from a file
+    # written by save(), to continue exactly as the saved machine would have
+    @staticmethod
+    def load(file: Union[str, IO], instructions: Union[InstructionsDict, Table],
+             tape_backend: Callable[[TwoWayTape], TwoWayTape] = None) -> TuringMachine:
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                data = f.read()
+        else:
+            data = file.read()
+        table = instructions if isinstance(instructions, Table) else Table(instructions)
+        offset = len(_CHECKPOINT_MAGIC)
+        if data[:offset] != _CHECKPOINT_MAGIC:
+            raise BadCheckpoint(requirement="Not a machine checkpoint")
+        if data[offset:offset + 32] != table.digest:
+            raise BadCheckpoint(requirement="Checkpoint was saved with a different table")
+        step, position = struct.unpack_from('<Qq', data, offset + 32)
+        offset += 48
+        m_config, offset = _unpack_str(data, offset)
+        step_comment, offset = _unpack_str(data, offset)
+        initial_m_config, offset = _unpack_str(data, offset)
+        initial_position, = struct.unpack_from('<q', data, offset)
+        tape, offset = TwoWayTape.from_bytes(data, offset + 8)
+        initial_tape, offset = TwoWayTape.from_bytes(data, offset)
+
+        machine = TuringMachine(initial_m_config, table, initial_position=initial_position, tape_backend=tape_backend)
+        machine._tape.close()
+        machine._initial_tape, machine._tape = initial_tape, machine._tape_backend(tape)
+        machine._m_configuration, machine._position, machine._step = m_config, position, step
+        machine._step_comment = step_comment
+        return machine
+
+
+_CHECKPOINT_MAGIC = b'TMCHECK\x01'
+# Terminations from the stop conditions of run() and steps()
+_STOP_KINDS = ('m-config', 'symbol', 'cells')
+# The most steps figures() runs at a time, between looking for the figures they wrote
+_FIGURES_CHUNK = 1 << 16
+
+
+# Whether adding squares first to last to the extent lo to hi (empty if hi < lo) would make the tape more than
+# max_cells squares long; the one test of the 'cells' stop condition, made before any step that would widen the extent
+def _too_long(lo: int, hi: int, first: int, last: int, max_cells: int) -> bool:
+    return (max(hi, last) - min(lo, first) if lo <= hi else last - first) >= max_cells
 
 
 # ======== Some errors
@@ -579,3 +2855,28 @@ class NonListableTableFormat(TuringError):
 
     def __str__(self) -> str:
         return str('Requested table format is not listable: {0}'.format(self.requirement))
+
+
+class BadDescription(TuringError):
+    """A standard description or description number is not well formed."""
+
+    def __init__(self, bad_token: str = '', requirement: str = '', position: int = None) -> None:
+        super().__init__(bad_token, requirement)
+        self.position = position
+
+    def __str__(self) -> str:
+        return str('{0} at position {1}: {2}'.format(self.requirement, self.position, self.bad_token))
+
+
+class InstrumentedMachine(TuringError):
+    """A run that cannot call the instrumentation (such as a Profiler) attached to a machine."""
+
+    def __str__(self) -> str:
+        return str('Cannot bypass instrumentation: {0}'.format(self.requirement))
+
+
+class BadCheckpoint(TuringError):
+    """A machine checkpoint is not valid, or is not for the table it is loaded with."""
+
+    def __str__(self) -> str:
+        return str('Cannot restore machine: {0}'.format(self.requirement))
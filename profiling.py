@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""
+Opt-in instrumentation of a machine: which rules are hot, which m-configurations are visited, where the head goes,
+and when the tape grows.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections import Counter
+from typing import Callable
+
+from machine import TuringMachine, MConfig, Symbol
+
+
+class Profiler(object):
+    """Counts what a machine does while enabled, through step() (and so steps()) and run().
+
+    Enabling replaces the machine's step and run methods with instrumented ones; disabling restores them, so a machine
+    that isn't being profiled runs exactly as fast as it would without a Profiler. Can be used as a context manager.
+    """
+
+    def __init__(self, machine: TuringMachine) -> None:
+        self._machine = machine
+        self.rule_hits = Counter()          # (m-configuration, symbol scanned) -> steps taken by that rule
+        self.m_config_visits = Counter()    # m-configuration -> steps taken from it
+        self.positions = Counter()          # Head position -> steps taken from it
+        self.growth = []                    # (step, first, last) each time the head leaves the squares seen so far
+        self.steps = 0
+        self.seconds = 0.0
+
+    def enable(self) -> Profiler:
+        self._lo, self._hi = self._machine._tape.extent
+        self._machine.step = self._step
+        self._machine.run = self._run
+        return self
+
+    def disable(self) -> None:
+        vars(self._machine).pop('step', None)
+        vars(self._machine).pop('run', None)
+
+    def __enter__(self) -> Profiler:
+        return self.enable()
+
+    def __exit__(self, *exc) -> None:
+        self.disable()
+
+    def _count(self, m_config: MConfig, symbol: Symbol, position: int, step: int) -> None:
+        self.rule_hits[(m_config, symbol)] += 1
+        self.m_config_visits[m_config] += 1
+        self.positions[position] += 1
+        self.steps += 1
+        if position < self._lo or position > self._hi:
+            self._lo, self._hi = min(self._lo, position), max(self._hi, position)
+            self.growth.append((step, self._lo, self._hi))
+
+    def _step(self, debug: bool = False) -> None:
+        machine = self._machine
+        m_config, position, step = machine._m_configuration, machine._position, machine._step
+        symbol = machine._tape.peek(position)
+        start = time.perf_counter()
+        type(machine).step(machine, debug)
+        self.seconds += time.perf_counter() - start
+        if machine._step != step:
+            self._count(m_config, symbol, position, machine._step)
+
+    def _run(self, max_steps: int = None, trace: Callable[[tuple[int, int, int, int]], None] = None,
+             **conditions) -> int:
+        machine = self._machine
+        state = [machine._table.compile().m_config_index.get(machine._m_configuration), machine._position,
+                 machine._step]
+
+        # The table is looked up on each step, as it may grow as the machine runs (see skeletons.SkeletonMachine)
+        def record(entry: tuple[int, int, int, int]) -> None:
+            following, position, scanned, _ = entry
+            previous, head, step = state
+            self._count(machine._table.compile().m_configs[previous], machine._tape.symbols[scanned], head, step + 1)
+            state[:] = following, position, step + 1
+            if trace is not None:
+                trace(entry)
+
+        start = time.perf_counter()
+        steps = type(machine).run(machine, max_steps, record, **conditions)
+        self.seconds += time.perf_counter() - start
+        return steps
+
+    def hot_rules(self, n: int = None) -> list[tuple[tuple[MConfig, Symbol], int]]:
+        return self.rule_hits.most_common(n)
+
+    def as_dict(self) -> dict:
+        return {
+            'steps': self.steps,
+            'seconds': self.seconds,
+            'steps_per_second': self.steps / self.seconds if self.seconds else None,
+            'rule_hits': [[m_config, symbol, count] for (m_config, symbol), count in self.rule_hits.most_common()],
+            'm_config_visits': dict(self.m_config_visits.most_common()),
+            'positions': {str(position): count for position, count in sorted(self.positions.items())},
+            'growth': [list(event) for event in self.growth],
+        }
+
+    def to_json(self, **kw) -> str:
+        return json.dumps(self.as_dict(), **kw)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""
+Skeleton tables (Turing p. 235): m-functions, m-configurations with parameters standing for m-configurations or
+symbols, such as f(C, B, α), instantiated into ordinary rules only when a running machine reaches them.
+
+An m-function is a Python function of its parameters returning rules as in an InstructionsDict, in which a final
+m-configuration may be a call: a tuple of an m-function name and its arguments, e.g. ('f', ('e1', C, B, a), B, a).
+Each call is named (here 'f(e1(C, B, a), B, a)') and instantiated at most once, the first time a machine reaches it,
+so tables whose full expansion would be enormous (such as U's) are built only as far as they are used.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Union, Iterable
+
+from machine import TuringMachine, Table, TwoWayTape, Behavior, InstructionsDict, MConfig, Symbol, Tape, E, L, R
+
+# An m-function name and its arguments, each a symbol, an m-configuration or another call
+MCall = tuple
+
+
+class Skeleton(object):
+    """M-functions and concrete rules, and every instantiation of them reached so far.
+
+    The alphabet is declared up front (and grows with any further symbols the instantiated rules use), so that
+    m-functions can give rules for "any" symbol; instantiations are shared by every machine using the skeleton.
+    """
+
+    def __init__(self, symbols: Iterable[Symbol], instructions: InstructionsDict = None) -> None:
+        self.symbols = [E] + [sym for sym in dict.fromkeys(symbols) if sym != E]
+        self._m_functions = {}                      # Name -> {number of parameters: function}
+        self._instructions = dict(instructions or {})
+        self._calls = {}                            # Name of an instantiation -> (m-function name, arguments)
+        self._rules = {}                            # Instantiated m-configuration -> rules
+        self._order = []                            # M-configurations in the order they first appear in rules
+        self._seen = set()
+        self._table = None
+        self._built = 0                             # Instantiated m-configurations when the table was last built
+
+    # Register function as the m-function name (by default its own name); names may be shared by m-functions with
+    # different numbers of parameters, as Turing's e(C, B, α) and e(B, α) are
+    def m_function(self, function: Callable = None, name: str = None) -> Callable:
+        if function is None:
+            return lambda f: self.m_function(f, name)
+        self._m_functions.setdefault(name or function.__name__, {})[function.__code__.co_argcount] = function
+        return function
+
+    # Every non-blank symbol, except those given ("any" and "not α" in Turing's tables)
+    def any(self, *excluded: Symbol) -> tuple[Symbol, ...]:
+        return tuple(sym for sym in self.symbols if sym != E and sym not in excluded)
+
+    # The name of the m-configuration for call (or m-configuration), registering it for instantiation when reached
+    def name(self, call: Union[MConfig, MCall]) -> MConfig:
+        if not isinstance(call, tuple):
+            return call
+        function, *args = call
+        args = [self.name(arg) for arg in args]
+        name = '{}({})'.format(function, ', '.join(args)) if args else function
+        self._calls.setdefault(name, (function, tuple(args)))
+        return name
+
+    def _add(self, m_config: MConfig) -> None:
+        if m_config not in self._seen:
+            self._seen.add(m_config)
+            self._order.append(m_config)
+
+    # Instantiate m_config if it hasn't been already; returns whether it was (and so the table has changed)
+    def expand(self, m_config: MConfig) -> bool:
+        if m_config in self._rules:
+            return False
+        if m_config in self._instructions:
+            rules = self._instructions[m_config]
+        else:
+            function, args = self._calls.get(m_config, (m_config, ()))
+            try:
+                m_function = self._m_functions[function][len(args)]
+            except KeyError:
+                return False
+            rules = m_function(*args)
+        self._add(m_config)
+        resolved = {}
+        for syms, rule in rules.items():
+            behavior = Behavior(*rule)
+            behavior = behavior._replace(final_m_config=self.name(behavior.final_m_config))
+            for sym in [*(syms if isinstance(syms, tuple) else (syms,)), *behavior.ops]:
+                if isinstance(sym, str) and sym not in self.symbols:
+                    self.symbols.append(sym)
+            self._add(behavior.final_m_config)
+            resolved[syms] = behavior
+        self._rules[m_config] = resolved
+        return True
+
+    def is_expanded(self, m_config: MConfig) -> bool:
+        return m_config in self._rules
+
+    # The rule instantiated for m_config on symbol, if there is one
+    def rule(self, m_config: MConfig, symbol: Symbol) -> Union[Behavior, None]:
+        for syms, behavior in self._rules.get(m_config, {}).items():
+            if symbol == syms or (isinstance(syms, tuple) and symbol in syms):
+                return behavior
+        return None
+
+    # The rules instantiated so far, as a Table, rebuilt only once there are twice as many as when it was last built
+    # (or whenever there are more, if current); building a table takes time in proportion to its size, so this keeps
+    # the total time spent building tables in proportion to the final size rather than its square, while machines
+    # take the steps the table doesn't have yet by rule(). M-configurations and symbols keep their indices as it
+    # grows, so compiled transitions and tapes stay valid from one to the next
+    def table(self, current: bool = False) -> Table:
+        if self._table is None or len(self._rules) >= 2 * self._built or (current and len(self._rules) > self._built):
+            self._built = len(self._rules)
+            self._table = Table(self._rules, m_config_ordering=self._order, symbol_ordering=self.symbols)
+        return self._table
+
+
+class SkeletonMachine(TuringMachine):
+    """A machine following a skeleton, instantiating each m-configuration it reaches as it reaches it.
+
+    The current m-configuration is always instantiated. The machine's table is replaced by the skeleton's each time
+    that is rebuilt, and the steps the table has no rules for yet are taken by the skeleton's rules, one at a time
+    (or, for runs with a trace or stop conditions, which those steps would bypass, after rebuilding the table).
+    """
+
+    def __init__(self, initial_m_configuration: Union[MConfig, MCall], skeleton: Skeleton,
+                 initial_tape: Union[Tape, str] = E, initial_position: int = 0,
+                 tape_backend: Callable[[TwoWayTape], TwoWayTape] = None) -> None:
+        self._skeleton = skeleton
+        initial_m_configuration = skeleton.name(initial_m_configuration)
+        for sym in initial_tape:
+            if sym not in skeleton.symbols:
+                skeleton.symbols.append(sym)
+        skeleton.expand(initial_m_configuration)
+        super().__init__(initial_m_configuration, skeleton.table(current=True), initial_tape, initial_position,
+                         tape_backend)
+
+    # Tapes give each symbol the index it has in the table, including symbols added to the skeleton since the tape
+    # was made
+    def _sync_symbols(self) -> None:
+        for sym in self._skeleton.symbols[len(self._tape.symbols):]:
+            self._tape.code(sym)
+
+    # Instantiate the current m-configuration if this is the first time it is reached, and take up the skeleton's
+    # table if it has been rebuilt (or, if current, rebuild it to have every rule instantiated so far)
+    def _expand(self, current: bool = False) -> None:
+        self._skeleton.expand(self._m_configuration)
+        self._sync_symbols()
+        self._table = self._skeleton.table(current)
+
+    # Take the next step by the skeleton's rules, once the machine's table has turned out not to have a rule for it;
+    # returns whether there was one
+    def _step_by_rule(self) -> bool:
+        behavior = self._skeleton.rule(self._m_configuration, self._tape[self._position])
+        if behavior is None:
+            return False
+        for op in behavior.ops:
+            if isinstance(op, int):
+                self._position += op
+            else:
+                self._tape[self._position] = op
+        self._m_configuration = behavior.final_m_config
+        self._step_comment = behavior.comment
+        self._step += 1
+        self._expand()
+        return True
+
+    def reset(self) -> None:
+        super().reset()
+        self._sync_symbols()
+
+    def step(self, debug: bool = False) -> None:
+        step = self._step
+        super().step()
+        if self._step != step:
+            self._expand()
+        elif not self._step_by_rule():
+            # Raises UnknownMConfig or UnknownSymbol, if debug
+            super().step(debug)
+
+    def run(self, max_steps: int = None, trace: Callable[[tuple[int, int, int, int]], None] = None,
+            stop_m_configs: Iterable[MConfig] = None, stop_symbols: Iterable[Symbol] = None,
+            max_cells: int = None) -> int:
+        conditions = stop_m_configs is not None or stop_symbols is not None or max_cells is not None
+        steps = 0
+        while True:
+            steps += super().run(None if max_steps is None else max_steps - steps, trace,
+                                 stop_m_configs, stop_symbols, max_cells)
+            if steps == max_steps or (conditions and self._termination is not None):
+                return steps
+            # The table has no rule for the next step, though the skeleton may (reached for the first time just now)
+            self._expand(current=trace is not None or conditions)
+            if self._skeleton.rule(self._m_configuration, self._tape[self._position]) is None:
+                return steps
+            if trace is None and not conditions:
+                self._step_by_rule()
+                steps += 1
+
+
+# ======== Turing's m-functions (Turing pp. 235-239), for any skeleton
+
+def turing_m_functions(skeleton: Skeleton) -> Skeleton:
+    m_function, any_ = skeleton.m_function, skeleton.any
+
+    def every():
+        return E, *any_()
+
+    # Find the leftmost α and go to C, or go to B if there is none
+    @m_function
+    def f(C, B, a):
+        return {'ə': ([L], ('f1', C, B, a)),
+                (E, *any_('ə')): ([L], ('f', C, B, a))}
+
+    @m_function
+    def f1(C, B, a):
+        return {a: ([], C),
+                any_(a): ([R], ('f1', C, B, a)),
+                E: ([R], ('f2', C, B, a))}
+
+    @m_function
+    def f2(C, B, a):
+        return {a: ([], C),
+                any_(a): ([R], ('f1', C, B, a)),
+                E: ([R], B)}
+
+    # Erase the leftmost α and go to C, or go to B if there is none; or erase every α and go to B
+    @m_function(name='e')
+    def e3(C, B, a):
+        return {every(): ([], ('f', ('e1', C, B, a), B, a))}
+
+    @m_function
+    def e1(C, B, a):
+        return {every(): ([E], C)}
+
+    @m_function(name='e')
+    def e2(B, a):
+        return {every(): ([], ('e', ('e', B, a), B, a))}
+
+    # Print β at the end of the figures and go to C
+    @m_function
+    def pe(C, b):
+        return {every(): ([], ('f', ('pe1', C, b), C, 'ə'))}
+
+    @m_function
+    def pe1(C, b):
+        return {any_(): ([R, R], ('pe1', C, b)),
+                E: ([b], C)}
+
+    # Move left or right, then go to C
+    @m_function
+    def l(C):
+        return {every(): ([L], C)}
+
+    @m_function
+    def r(C):
+        return {every(): ([R], C)}
+
+    # Find the leftmost α and go to C with the head one square to its left or right
+    @m_function(name="f'")
+    def f_left(C, B, a):
+        return {every(): ([], ('f', ('l', C), B, a))}
+
+    @m_function(name="f''")
+    def f_right(C, B, a):
+        return {every(): ([], ('f', ('r', C), B, a))}
+
+    # Copy the symbol marked with the leftmost α to the end, and go to C
+    @m_function
+    def c(C, B, a):
+        return {every(): ([], ("f'", ('c1', C), B, a))}
+
+    @m_function
+    def c1(C):
+        return {sym: ([], ('pe', C, sym)) for sym in any_()}
+
+    # Copy the symbol marked with the leftmost α to the end and erase the mark; or do so for every α
+    @m_function(name='ce')
+    def ce_leftmost(C, B, a):
+        return {every(): ([], ('c', ('e', C, B, a), B, a))}
+
+    @m_function(name='ce')
+    def ce_every(B, a):
+        return {every(): ([], ('ce', ('ce', B, a), B, a))}
+
+    # Replace the leftmost α with β and go to C, or go to B if there is none; or replace every α
+    @m_function(name='re')
+    def re4(C, B, a, b):
+        return {every(): ([], ('f', ('re1', C, B, a, b), B, a))}
+
+    @m_function
+    def re1(C, B, a, b):
+        return {every(): ([E, b], C)}
+
+    @m_function(name='re')
+    def re3(B, a, b):
+        return {every(): ([], ('re', ('re', B, a, b), B, a, b))}
+
+    # Copy the symbols marked with α to the end, re-marking them with 'a'
+    @m_function(name='cr')
+    def cr3(C, B, a):
+        return {every(): ([], ('c', ('re', C, B, a, 'a'), B, a))}
+
+    @m_function(name='cr')
+    def cr2(B, a):
+        return {every(): ([], ('cr', ('cr', B, a), ('re', B, 'a', a), a))}
+
+    # Compare the first symbols marked α and β: go to C if they are alike (or neither exists), A if not, E if only
+    # the first exists
+    @m_function
+    def cp(C, A, E_, a, b):
+        return {every(): ([], ("f'", ('cp1', C, A, b), ('f', A, E_, b), a))}
+
+    @m_function
+    def cp1(C, A, b):
+        return {sym: ([], ("f'", ('cp2', C, A, sym), A, b)) for sym in any_()}
+
+    @m_function
+    def cp2(C, A, g):
+        return {g: ([], C),
+                (E, *any_(g)): ([], A)}
+
+    # As cp, but erasing the marks when the symbols are alike; or compare every pair of marked symbols
+    @m_function(name='cpe')
+    def cpe5(C, A, E_, a, b):
+        return {every(): ([], ('cp', ('e', ('e', C, C, b), C, a), A, E_, a, b))}
+
+    @m_function(name='cpe')
+    def cpe4(A, E_, a, b):
+        return {every(): ([], ('cpe', ('cpe', A, E_, a, b), A, E_, a, b))}
+
+    # Find the last symbol (and go to C), or the last α
+    @m_function(name='g')
+    def g1_(C):
+        return {any_(): ([R], ('g', C)),
+                E: ([R], ('g1', C))}
+
+    @m_function(name='g1')
+    def g1_1(C):
+        return {any_(): ([R], ('g', C)),
+                E: ([], C)}
+
+    @m_function(name='g')
+    def g2(C, a):
+        return {every(): ([], ('g', ('g1', C, a)))}
+
+    @m_function(name='g1')
+    def g1_2(C, a):
+        return {a: ([], C),
+                (E, *any_(a)): ([L], ('g1', C, a))}
+
+    # Print α then β at the end
+    @m_function
+    def pe2(C, a, b):
+        return {every(): ([], ('pe', ('pe', C, b), a))}
+
+    # Copy the symbols marked with α, β (, γ, ...) in turn to the end, erasing the marks
+    @m_function
+    def ce2(B, a, b):
+        return {every(): ([], ('ce', ('ce', B, b), a))}
+
+    @m_function
+    def ce3(B, a, b, g):
+        return {every(): ([], ('ce', ('ce2', B, b, g), a))}
+
+    @m_function
+    def ce4(B, a, b, g, d):
+        return {every(): ([], ('ce', ('ce3', B, b, g, d), a))}
+
+    @m_function
+    def ce5(B, a, b, g, d, e):
+        return {every(): ([], ('ce', ('ce4', B, b, g, d, e), a))}
+
+    # Erase every mark (symbol on an E-square), then go to C
+    @m_function(name='e')
+    def e_all(C):
+        return {'ə': ([R], ('e1', C)),
+                (E, *any_('ə')): ([L], ('e', C))}
+
+    @m_function(name='e1')
+    def e1_all(C):
+        return {any_(): ([R, E, R], ('e1', C)),
+                E: ([], C)}
+
+    return skeleton
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+# Timing and memory benchmarks, written as JSON so that runs from different commits can be compared:
+#
+#   python tests/benchmark.py --output before.json
+#   python tests/benchmark.py --compare before.json
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from typing import Callable
+
+from machine import TuringMachine, Table, R, L, E, Behavior
+
+# ======== The example machines (as in eyeball.py)
+
+alternate = {
+    'b':
+        {E: (['0', R], 'c')},
+    'c':
+        {E: Behavior([R], 'e')},
+    'e':
+        {E: (['1', R], 'f')},
+    'f':
+        {E: ([R], 'b')}
+}
+
+alternate_compact = {
+    'b':
+        {E: (['0'], 'b'),
+         '0': ([R, R, '1'], 'b'),
+         '1': ([R, R, '0'], 'b')}
+}
+
+increment = {
+    'r':
+        {E: ([L], 'c', "Scanning complete: backup and enter c"),
+         ('0', '1'): ([R], 'r', "Scan to the rightmost digit ...")},
+    'c':
+        {(E, '0'): (['1', L], 'd', "Done: complete carry and enter d"),
+         '1': (['0', L], 'c', "Carry ...")}
+}
+
+increasing = {
+    'b':
+        {E: (['ə', R, 'ə', R, '0', R, R, '0', L, L], 'o')},
+    'o':
+        {'1': ([R, 'x', L, L, L], 'o'),
+         '0': ([], 'q')},
+    'q':
+        {('0', '1'): ([R, R], 'q'),
+         E: (['1', L], 'p')},
+    'p':
+        {'x': ([E, R], 'q'),
+         'ə': ([R], 'f'),
+         E: ([L, L], 'p')},
+    'f':
+        {('0', '1'): ([R, R], 'f'),
+         E: (['0', L, L], 'o')},
+}
+
+# As increasing, with long moves
+increasing_long = {
+    'b':
+        {E: (['ə', R, 'ə', R, '0', 2, '0', -2], 'o')},
+    'o':
+        {'1': ([R, 'x', -3], 'o'),
+         '0': ([], 'q')},
+    'q':
+        {('0', '1'): ([2], 'q'),
+         E: (['1', L], 'p')},
+    'p':
+        {'x': ([E, R], 'q'),
+         'ə': ([R], 'f'),
+         E: ([-2], 'p')},
+    'f':
+        {('0', '1'): ([2], 'f'),
+         E: (['0', -2], 'o')},
+}
+
+blanks_right_dn = 31335317
+zeros_right_dn = 313325317
+ones_right_dn = 3133225317
+
+
+# Each machine as (initial m-configuration, instructions, initial tape for a run of about steps steps); the increment
+# machine halts after a pass over its tape and back, so is given a tape long enough to keep it busy. The synthetic
+# tables (see synthetic_table) step from m-configuration to m-configuration at random, with no sweeps to cross
+MACHINES = {
+    'alternate': lambda steps: ('b', alternate, E),
+    'alternate_compact': lambda steps: ('b', alternate_compact, E),
+    'increment': lambda steps: ('r', increment, '1' * (steps // 2)),
+    'increasing': lambda steps: ('b', increasing, E),
+    'increasing_long': lambda steps: ('b', increasing_long, E),
+    'blanks_right_dn': lambda steps: ('q1', Table(blanks_right_dn), E),
+    'zeros_right_dn': lambda steps: ('q1', Table(zeros_right_dn), E),
+    'ones_right_dn': lambda steps: ('q1', Table(ones_right_dn), E),
+    'synthetic_200': lambda steps: ('m0', synthetic_table(200), E),
+    'synthetic_2000': lambda steps: ('m0', synthetic_table(2000), E),
+}
+
+
+# A standard form table with n m-configurations and k symbols, random but the same on every run
+def synthetic_table(n: int, k: int = 3) -> dict:
+    rng = random.Random(n * 1000 + k)
+    m_configs = ['m{}'.format(i) for i in range(n)]
+    symbols = [E] + [str(i) for i in range(1, k)]
+    return {m_config: {symbol: ([rng.choice(symbols), rng.choice([R, L])], rng.choice(m_configs))
+                       for symbol in symbols}
+            for m_config in m_configs}
+
+
+# ======== Benchmarks
+# Each returns a function that does the work to be measured once (from scratch) and returns how many units of work it
+# did (steps, rules, characters, ...)
+
+def bench_run(machine: str, steps: int) -> Callable[[], int]:
+    initial_m_config, instructions, initial_tape = MACHINES[machine](steps)
+    table = instructions if isinstance(instructions, Table) else Table(instructions)
+    table.compile()
+
+    def work() -> int:
+        return TuringMachine(initial_m_config, table, initial_tape=initial_tape).run(steps)
+    return work
+
+
+def bench_specialized(machine: str, steps: int) -> Callable[[], int]:
+    initial_m_config, instructions, initial_tape = MACHINES[machine](steps)
+    table = instructions if isinstance(instructions, Table) else Table(instructions)
+    table.specialize()
+
+    def work() -> int:
+        return TuringMachine(initial_m_config, table, initial_tape=initial_tape).run_specialized(steps)
+    return work
+
+
+def bench_macro(machine: str, steps: int, block_size: int = 2) -> Callable[[], int]:
+    initial_m_config, instructions, initial_tape = MACHINES[machine](steps)
+    table = instructions if isinstance(instructions, Table) else Table(instructions)
+    table.macro(block_size)
+
+    def work() -> int:
+        return TuringMachine(initial_m_config, table, initial_tape=initial_tape).run_macro(steps, block_size)
+    return work
+
+
+def bench_steps(machine: str, steps: int) -> Callable[[], int]:
+    initial_m_config, instructions, initial_tape = MACHINES[machine](steps)
+    table = instructions if isinstance(instructions, Table) else Table(instructions)
+
+    def work() -> int:
+        m = TuringMachine(initial_m_config, table, initial_tape=initial_tape)
+        for _ in m.steps(steps, include_current=False):
+            pass
+        return m._step
+    return work
+
+
+def bench_construct(n: int) -> Callable[[], int]:
+    instructions = synthetic_table(n)
+
+    def work() -> int:
+        Table(instructions)
+        return n * 3
+    return work
+
+
+def bench_parse(n: int, representation: str) -> Callable[[], int]:
+    description = Table(synthetic_table(n)).instructions(representation, 'string')
+
+    def work() -> int:
+        Table.dict_from_representation(description, representation)
+        return len(description)
+    return work
+
+
+def bench_render(n: int, representation: str) -> Callable[[], int]:
+    table = Table(synthetic_table(n))
+
+    def work() -> int:
+        table.invalidate()
+        return len(table.instructions(representation, 'string'))
+    return work
+
+
+def benchmarks(step_counts: list[int], table_sizes: list[int]) -> dict[str, tuple[Callable[[], int], str]]:
+    found = {}
+    for machine in MACHINES:
+        for steps in step_counts:
+            found['run/{}/{}'.format(machine, steps)] = (bench_run(machine, steps), 'steps')
+            found['specialized/{}/{}'.format(machine, steps)] = (bench_specialized(machine, steps), 'steps')
+            # Against run/: blocks of 2 squares, and of 4, which alternate's repeat in but few others' do
+            found['macro/{}/{}'.format(machine, steps)] = (bench_macro(machine, steps), 'steps')
+            found['macro4/{}/{}'.format(machine, steps)] = (bench_macro(machine, steps, 4), 'steps')
+            # Stepping one step at a time is much slower; keep it to the smaller counts
+            if steps <= 100_000:
+                found['steps/{}/{}'.format(machine, steps)] = (bench_steps(machine, steps), 'steps')
+    for n in table_sizes:
+        found['construct/{}'.format(n)] = (bench_construct(n), 'rules')
+        for representation in ['SD', 'DN']:
+            found['parse/{}/{}'.format(representation, n)] = (bench_parse(n, representation), 'chars')
+        for representation in ['SD', 'DN', 'tuples', 'wolfram']:
+            found['render/{}/{}'.format(representation, n)] = (bench_render(n, representation), 'chars')
+    return found
+
+
+# ======== Measuring and comparing
+
+# The best of repeat timings, then the peak memory allocated by one more (traced, so slower) run
+def measure(work: Callable[[], int], repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        units = work()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    work()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = min(times)
+    return {'units': units, 'seconds': seconds, 'rate': units / seconds if seconds else None, 'peak_bytes': peak}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'commit': commit,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+# Print each benchmark in both results; return the names of those that got slower or used more memory by more than
+# threshold (as a fraction)
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    regressions = []
+    print('{:<36} {:>14} {:>14} {:>8} {:>8}'.format('benchmark', 'baseline/s', 'current/s', 'speed', 'memory'))
+    for name, current in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]
+        speed = current['rate'] / before['rate'] if current['rate'] and before['rate'] else 1.0
+        memory = current['peak_bytes'] / before['peak_bytes'] if before['peak_bytes'] else 1.0
+        flag = ''
+        if speed < 1 - threshold or memory > 1 + threshold:
+            regressions.append(name)
+            flag = '  <<<'
+        print('{:<36} {:>14,.0f} {:>14,.0f} {:>7.2f}x {:>7.2f}x{}'.format(
+            name, before['rate'] or 0, current['rate'] or 0, speed, memory, flag))
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time the example machines, table construction, parsing and "
+                                                 "rendering of descriptions.")
+    parser.add_argument('--steps', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help="step counts to run each example machine for")
+    parser.add_argument('--tables', type=int, nargs='+', default=[100, 1_000, 10_000],
+                        help="numbers of m-configurations in the synthetic tables")
+    parser.add_argument('--repeat', type=int, default=5, help="timings of each benchmark (the best is kept)")
+    parser.add_argument('--only', default='', help="run only benchmarks whose names contain this")
+    parser.add_argument('--output', help="file to write the results to, as JSON")
+    parser.add_argument('--compare', help="results file (from --output) to compare with")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="fraction by which speed may drop or memory rise before --compare reports a regression")
+    args = parser.parse_args(argv)
+
+    results = {'environment': environment(), 'results': {}}
+    for name, (work, unit) in benchmarks(args.steps, args.tables).items():
+        if args.only not in name:
+            continue
+        result = measure(work, args.repeat)
+        result['unit'] = unit
+        results['results'][name] = result
+        if not args.compare:
+            print('{:<36} {:>14,.0f} {}/s {:>12,} bytes'.format(name, result['rate'] or 0, unit, result['peak_bytes']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print('\n{} regression(s): {}'.format(len(regressions), ', '.join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
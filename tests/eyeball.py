@@ -144,6 +144,11 @@ print("........ 10 steps with generator (continue)")
 for q in alternate_machine.steps(10, extend=True):
     print(q.str_complete_configuration())
 
+print("\n-------- Auto halt on a translated cycle (the same pattern drifting right); complete configuration")
+for q in alternate_machine.steps(auto_halt=True):
+    print(q.str_complete_configuration())
+print(alternate_machine.termination)
+
 # print("----- Endless steps with generator (continue)")
 # for q in alternate_machine.steps(auto_halt=True):
 #     print(q.str_complete_configuration())
@@ -194,6 +199,21 @@ for q in increasing_machine.steps(40):
 print("\n-------- Turing's compact complete configurations (Petzold p. 92, Turing p. 235)")
 print(':'.join([x.str_complete_configuration() for x in increasing_machine.steps(8)]))
 
+print("\n-------- Compiled run of 1000 steps; complete config, same as 1000 steps with step()")
+increasing_machine.reset()
+increasing_machine.run(1000)
+print(increasing_machine.str_complete_configuration())
+
+print("\n-------- Tape window of 11 squares around the head after 1000 steps; string and symbol indices")
+position = increasing_machine._position
+print(increasing_machine.str_tape(position - 5, position + 6))
+print(list(increasing_machine.tape_window(position - 5, position + 6)))
+
+print("\n-------- Macro machine run (blocks of 4) of 1000 steps; complete config, same as above")
+increasing_machine.reset()
+increasing_machine.run_macro(1000, 4)
+print(increasing_machine.str_complete_configuration())
+
 
 # -------- Machine definition representations; SD, DN, etc.
 
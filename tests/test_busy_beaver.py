@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import json
+
+from busy_beaver import search, from_text, to_text
+
+
+def test_search_finds_busy_beaver(tmp_path):
+    checkpoint = str(tmp_path / 'search.json')
+    results = list(search(2, 2, max_steps=100, processes=1, checkpoint=checkpoint))
+    assert len({r.table for r in results}) == len(results)
+    best = max((r for r in results if r.kind == 'halted'), key=lambda r: (r.score, r.steps))
+    assert (best.table, best.steps, best.score) == ('1RB1LB_1LA---', 5, 4)
+    assert to_text(from_text(best.table), 2, 2) == best.table
+    with open(checkpoint) as f:
+        saved = json.load(f)
+    assert sum(saved['counts'].values()) == len(results) and saved['champion'][0] == best.table
+    # Everything is done, so resuming has nothing left to search
+    assert list(search(2, 2, max_steps=100, processes=1, checkpoint=checkpoint)) == []
@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import re
+
+from descriptions import description_numbers, is_well_formed, scan
+
+
+def test_description_numbers_match_brute_force():
+    form = re.compile(r'(31+32*32*[456]31+7)+')
+    start, stop = 3133253117, 3133353117
+    expected = [n for n in range(start, stop) if form.fullmatch(str(n)) and is_well_formed(n)]
+    assert list(description_numbers(start, stop)) == expected
+    assert is_well_formed(31334317) and not is_well_formed(3133431731335317)   # Two rules for q1 on a blank
+
+
+def test_scan_in_parallel_matches_serial():
+    serial = list(scan(0, 10 ** 12, steps=10, processes=1, chunk_size=10 ** 10))
+    parallel = list(scan(0, 10 ** 12, steps=10, processes=2, chunk_size=10 ** 10))
+    assert [(d.number, d.steps, d.tape) for d in serial] == [(d.number, d.steps, d.tape) for d in parallel]
+    assert serial[0].number == 31334317 and serial[0].steps == 10
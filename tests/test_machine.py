@@ -0,0 +1,571 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import asyncio
+import io
+import pickle
+import random
+
+import pytest
+
+from machine import TuringMachine, Table, R, L, N, E, Behavior, Termination, BadDescription, BadCheckpoint, MMapTape, TapeRenderer
+from machine import UnknownMConfig, UnknownSymbol, TwoWayTape
+
+
+increasing = {
+    'b':
+        {E: (['ə', R, 'ə', R, '0', R, R, '0', L, L], 'o')},
+    'o':
+        {'1': ([R, 'x', L, L, L], 'o'),
+         '0': ([], 'q')},
+    'q':
+        {('0', '1'): ([R, R], 'q'),
+         E: (['1', L], 'p')},
+    'p':
+        {'x': ([E, R], 'q'),
+         'ə': ([R], 'f'),
+         E: ([L, L], 'p')},
+    'f':
+        {('0', '1'): ([R, R], 'f'),
+         E: (['0', L, L], 'o')},
+}
+
+# As increasing, with long moves
+increasing_long = {
+    'b':
+        {E: (['ə', R, 'ə', R, '0', 2, '0', -2], 'o')},
+    'o':
+        {'1': ([R, 'x', -3], 'o'),
+         '0': ([], 'q')},
+    'q':
+        {('0', '1'): ([2], 'q'),
+         E: (['1', L], 'p')},
+    'p':
+        {'x': ([E, R], 'q'),
+         'ə': ([R], 'f'),
+         E: ([-2], 'p')},
+    'f':
+        {('0', '1'): ([2], 'f'),
+         E: (['0', -2], 'o')},
+}
+
+increment = {
+    'r':
+        {E: ([L], 'c', "Scanning complete: backup and enter c"),
+         ('0', '1'): ([R], 'r', "Scan to the rightmost digit ...")},
+    'c':
+        {(E, '0'): (['1', L], 'd', "Done: complete carry and enter d"),
+         '1': (['0', L], 'c', "Carry ...")}
+}
+
+
+def _state(machine: TuringMachine) -> tuple:
+    return machine.str_complete_configuration(), machine._position, machine._step, machine.step_comment
+
+
+# Take steps by interpreting each behavior's ops one at a time, independently of the compiled table that step(), run()
+# and the other fast paths use, so that equivalence tests check them against something other than themselves
+def _reference_steps(machine: TuringMachine, steps: int) -> None:
+    table, tape = machine._table, machine._tape
+    for _ in range(steps):
+        try:
+            behavior = table.behavior(machine._m_configuration, tape[machine._position])
+        except (UnknownMConfig, UnknownSymbol):
+            return
+        for op in behavior.ops:
+            if isinstance(op, int):
+                machine._position += op
+            else:
+                tape[machine._position] = op
+        machine._m_configuration = behavior.final_m_config
+        machine._step_comment = behavior.comment
+        machine._step += 1
+
+
+@pytest.mark.parametrize('m_config, instructions, tape', [
+    ('b', increasing, E),
+    ('b', increasing_long, E),
+    ('r', increment, '101011'),
+    ('r', increment, ' 111111'),
+    ('q1', Table.dict_from_representation(3133225317, 'DN'), E),
+])
+@pytest.mark.parametrize('steps', [0, 1, 5, 100, 2000])
+def test_run_matches_step(m_config, instructions, tape, steps) -> None:
+    reference = TuringMachine(m_config, instructions, initial_tape=tape)
+    _reference_steps(reference, steps)
+    stepped = TuringMachine(m_config, instructions, initial_tape=tape)
+    for _ in range(steps):
+        stepped.step()
+    run = TuringMachine(m_config, instructions, initial_tape=tape)
+    run.run(steps)
+    assert _state(run) == _state(stepped) == _state(reference)
+    assert run._tape.extent == stepped._tape.extent == reference._tape.extent
+
+
+def test_tape_grows_left() -> None:
+    machine = TuringMachine('b', {'b': {E: (['1', L], 'c')}, 'c': {E: (['0', L], 'b')}},
+                            initial_tape='xy', initial_position=-1)
+    machine.run(4)
+    assert machine.str_tape() == "0101xy"
+    assert machine.str_complete_configuration() == "b 0101xy"
+    assert machine._tape.extent == (-4, 1)
+    assert machine.str_tape(-6, -1) == "  010"
+    assert bytes(machine.tape_window(-4, 0)) == bytes(machine.tape_symbols.index(s) for s in "0101")
+
+
+alternate_standard = {
+    'b':
+        {E: (['0', R], 'c')},
+    'c':
+        {E: ([E, R], 'e')},
+    'e':
+        {E: (['1', R], 'f')},
+    'f':
+        {E: ([E, R], 'b')}
+}
+
+
+def test_tape_has_one_symbol_for_each_square():
+    # Symbols of more than one character, such as U's ::, are single squares, however str_tape() runs them together
+    machine = TuringMachine('b', {'b': {E: (['::', R, ':', R], 'b')}}, initial_tape=';', initial_position=1)
+    machine.run(2)
+    assert machine.tape == [';', '::', ':', '::', ':', E]
+    assert machine.str_tape() == ';:::::: '
+
+
+
+@pytest.mark.parametrize('m_config, instructions, tape', [
+    ('b', increasing, E),
+    ('b', alternate_standard, E),
+    ('r', increment, '1' * 40),
+])
+@pytest.mark.parametrize('block_size', [1, 2, 3, 4])
+@pytest.mark.parametrize('steps', [0, 1, 7, 500, 3001])
+def test_run_macro_matches_run(m_config, instructions, tape, block_size, steps) -> None:
+    run = TuringMachine(m_config, instructions, initial_tape=tape)
+    _reference_steps(run, steps)
+    macro = TuringMachine(m_config, instructions, initial_tape=tape)
+    macro.run_macro(steps, block_size)
+    assert _state(macro) == _state(run)
+    assert macro._tape.extent == run._tape.extent
+
+
+def test_run_macro_jumps_runs_of_blocks():
+    # Each run of identical blocks is crossed in one jump, however long, with the exact step count
+    machine = TuringMachine('b', {'b': {E: (['1', R], 'c')}, 'c': {E: (['1', R], 'b')}})
+    assert machine.run_macro(10 ** 7, 4) == 10 ** 7
+    assert (machine._position, machine._m_configuration, machine._tape.extent) == (10 ** 7, 'b', (0, 10 ** 7 - 1))
+    assert machine._tape._cells.count(0) == len(machine._tape._cells) - 10 ** 7
+    table = Table(increasing)
+    macro, specialized = TuringMachine('b', table), TuringMachine('b', table)
+    macro.run_macro(300_000, 2)
+    specialized.run_specialized(300_000)
+    assert _state(macro) == _state(specialized) and macro._tape.extent == specialized._tape.extent
+
+
+def test_run_macro_leaves_blocks_that_do_not_repeat_to_run():
+    # alternate_standard writes 0 1 0 1 ..., so blocks of 2 squares never repeat and each transition is 2 steps: once
+    # that has been judged, run_macro carries on with run(); blocks of 4 repeat, and are crossed in one jump
+    table = Table(alternate_standard)
+    macro, stepped = TuringMachine('b', table), TuringMachine('b', table)
+    assert macro.run_macro(10_000, 2) == 10_000 and table.macro(2)._unpaying()
+    _reference_steps(stepped, 10_000)
+    assert _state(macro) == _state(stepped) and macro._tape.extent == stepped._tape.extent
+    assert macro.run_macro(10 ** 7, 4) == 10 ** 7 and not table.macro(4)._unpaying()
+    assert table.macro(4)._taken == 1
+
+
+@pytest.mark.parametrize('m_config, instructions, tape, termination', [
+    ('r', increment, '101011', Termination('halted', 10)),
+    ('a', {'a': {E: ([R], 'b')}, 'b': {E: ([L], 'a')}}, E, Termination('cycle', 0, 2)),
+    ('a', {'a': {'1': ([R], 'a'), E: ([L], 'b')}, 'b': {'1': ([L], 'b'), E: ([R], 'a')}}, '1' * 20,
+     Termination('cycle', 0, 42)),
+    ('a', {'a': {E: (['1', R], 'c')}, 'c': {E: ([R], 'd')}, 'd': {E: ([L], 'c')}}, E, Termination('cycle', 1, 2)),
+    ('b', alternate_standard, E, Termination('translated cycle', 4, 4, 4)),
+    ('b', {'b': {E: (['1', L], 'c')}, 'c': {E: (['0', L], 'b')}}, E, Termination('translated cycle', 2, 2, -2)),
+    ('b', {'b': {E: (['0'], 'b'), '0': ([R, R, '1'], 'b'), '1': ([R, R, '0'], 'b')}}, E,
+     Termination('translated cycle', 2, 2, 4)),
+    ('b', increasing, E, None),
+])
+def test_auto_halt_termination(m_config, instructions, tape, termination) -> None:
+    machine = TuringMachine(m_config, instructions, initial_tape=tape)
+    for _ in machine.steps(5000, auto_halt=True):
+        pass
+    assert machine.termination == termination
+
+
+@pytest.mark.parametrize('steps', [0, 1, 9, 40])
+def test_run_batch_matches_run(steps) -> None:
+    pytest.importorskip('numpy')
+    table = Table(increment)
+    initial_tapes = ['1011', '0', '', '111111', '10x1', '0101011']
+    result = table.run_batch(initial_tapes, 'r', steps)
+    for row, initial_tape in enumerate(initial_tapes):
+        machine = TuringMachine('r', table, initial_tape=list(initial_tape))
+        taken = machine.run(steps)
+        assert result.str_tape(row) == machine.str_tape()
+        assert (result.positions[row], result.m_config(row), result.steps[row], result.halted[row]) == \
+               (machine._position, machine._m_configuration, taken, taken < steps)
+
+
+def test_parse_description_sources():
+    dn = 31332531173113353111731113322531111731111335317
+    expected = Table.dict_from_representation(str(dn), 'DN')
+    assert Table.dict_from_representation(dn, 'DN') == expected
+    assert Table.dict_from_representation(io.BytesIO(str(dn).encode()), 'DN') == expected
+    # 1000 copies of one instruction, too long for str(), which is limited to a few thousand digits
+    long_dn = 3133253117 * (10 ** 10000 - 1) // (10 ** 10 - 1)
+    assert len(Table.dict_from_representation(long_dn, 'DN')['q1']) == 1
+    with pytest.raises(BadDescription) as error:
+        Table.dict_from_representation('DADDCRDAA;DAADDRDA;DAx', 'SD')
+    assert error.value.position == 19
+
+
+def test_instructions_cache_invalidation():
+    table = Table(alternate_standard)
+    dn = table.instructions('DN', 'string')
+    assert table.instructions('DN', 'string') is dn
+    table._m_config_ordering = list(reversed(table._m_config_ordering))
+    assert table.instructions('DN', 'string') != dn
+    # The instructions given out are copies, so changing them leaves the table as it was
+    instructions = table.dict
+    instructions['b'][E] = Behavior(['1', R], 'c')
+    assert type(instructions) is dict and table.dict['b'][E] != instructions['b'][E]
+    assert table.instructions() == table.dict and table.instructions() is not table.instructions()
+
+
+def test_tables_are_shared():
+    table = Table(increasing)
+    machines = [TuringMachine('b', table) for _ in range(3)]
+    assert all(machine._table is table for machine in machines)
+    machines[0].run(50)
+    assert machines[1].str_tape() == E
+    copied = pickle.loads(pickle.dumps(table))
+    assert copied.dict == table.dict and copied._m_config_ordering == table._m_config_ordering
+    assert TuringMachine('b', copied).run(50) == 50 and TuringMachine('b', copied).str_tape() == E
+
+
+def test_save_and_load(tmp_path):
+    table = Table(increasing)
+    machine = TuringMachine('b', table)
+    machine.run(500)
+    file = io.BytesIO()
+    machine.save(file)
+    file.seek(0)
+    restored = TuringMachine.load(file, table)
+    machine.run(500)
+    restored.run(500)
+    assert _state(restored) == _state(machine) and restored.step_comment == machine.step_comment
+    checkpoint = str(tmp_path / 'machine.bin')
+    for _ in machine.steps(100, checkpoint=checkpoint, checkpoint_steps=30):
+        pass
+    assert _state(TuringMachine.load(checkpoint, increasing)) == _state(machine)
+    with pytest.raises(BadCheckpoint):
+        TuringMachine.load(checkpoint, alternate_standard)
+
+
+@pytest.mark.parametrize('m_config, instructions', [
+    ('b', increasing),
+    ('b', {'b': {E: (['1', L], 'b')}}),
+])
+def test_mmap_tape_matches(m_config, instructions):
+    machine = TuringMachine(m_config, instructions)
+    mapped = TuringMachine(m_config, instructions, tape_backend=MMapTape.from_tape)
+    assert isinstance(mapped._tape, MMapTape)
+    machine.run(10000)
+    mapped.run(10000)
+    assert _state(mapped) == _state(machine)
+    copied = TwoWayTape.from_tape(mapped._tape)
+    assert (copied.extent, str(copied)) == (machine._tape.extent, machine.str_tape())
+    tape = mapped._tape
+    mapped.reset()
+    assert isinstance(mapped._tape, MMapTape) and mapped.str_tape() == E
+    assert tape._cells.closed
+
+
+def test_mmap_tape_grows_left_sparsely():
+    tape = MMapTape(initial_tape='01')
+    tape[-(1 << 26)] = '1'
+    assert tape.extent == (-(1 << 26), 1) and tape.peek(1) == '1' and tape.peek(-1) == E
+    copied = MMapTape.from_tape(tape)
+    assert copied.extent == tape.extent and copied.peek(-(1 << 26)) + copied.str_window(-1, 2) == '1 01'
+    copied.close()
+    # Blank pages, the new ones included, are never written, so (where the file system allows) take no space
+    assert os.fstat(tape._file.fileno()).st_blocks * 512 < 1 << 20
+    tape.close()
+
+
+def test_incremental_rendering_matches_full():
+    machine = TuringMachine('b', increasing)
+    for step in machine.steps(300):
+        rendered = step.display_text(show_step=True)
+        step._renderer = TapeRenderer(step)
+        assert rendered == step.display_text(show_step=True)
+    machine.run(200)
+    assert machine.str_complete_configuration(width=9) == '…1 1p 1 1…'
+    # Only the squares shown are kept, and a window too narrow for the elision markers is widened to keep the head
+    for step in machine.steps(300):
+        rendered = step.display_text(width=15)
+        step._renderer = TapeRenderer(step)
+        assert rendered == step.display_text(width=15) and len(step._renderer._squares) <= 15
+    for width in (1, 2, 3):
+        assert machine.str_complete_configuration(width=width) == machine.str_complete_configuration(width=3)
+    assert machine.str_complete_configuration(width=3).count('…') == 2
+
+
+def test_snapshots_keep_history():
+    machine = TuringMachine('b', increasing)
+    history = list(machine.steps(2000, snapshots=True))
+    replayed = TuringMachine('b', increasing)
+    for step, snapshot in enumerate(history):
+        if step % 97 == 0 or step == len(history) - 1:
+            assert snapshot.str_complete_configuration() == replayed.str_complete_configuration()
+            assert (snapshot.position, snapshot.step, snapshot.step_comment) == _state(replayed)[1:]
+        replayed.step()
+    # Only some snapshots hold a copy of the tape
+    assert sum(snapshot._keyframe is not None for snapshot in history) < len(history) // 10
+
+
+def test_snapshots_of_a_moving_machine_keep_short_chains():
+    # Only moves, so no changes add up to a keyframe; the chains of snapshots back to one stay short all the same
+    machine = TuringMachine('b', {'b': {E: ([R], 'c')}, 'c': {E: ([R, R, L], 'b')}}, initial_tape='0')
+    history = list(machine.steps(1000, snapshots=True))
+    for snapshot in history:
+        depth, configuration = 0, snapshot
+        while configuration._keyframe is None:
+            depth, configuration = depth + 1, configuration._previous
+        assert depth <= 64
+    assert history[-1].str_complete_configuration() == machine.str_complete_configuration()
+
+
+def test_figures_stream_the_computed_sequence():
+    machine = TuringMachine('b', increasing)
+    figures = ''.join(machine.figures(30))
+    assert figures == '001011011101111011111011111101'
+    reference = TuringMachine('b', increasing)
+    reference.run(machine._step)
+    assert figures == ''.join(sym for sym in reference.str_tape()[::2] if sym in '01')[:30]
+    halting = TuringMachine('r', {'r': {E: (['1', R], 's')}, 's': {E: ([R], 't')}, 't': {E: (['0', R], 'u')}})
+    assert list(halting.figures()) == ['1', '0']
+    assert list(machine.figures(0)) == list(machine.figures(0, max_steps=100)) == [] and machine._step == reference._step
+    # Later calls yield the sequence from its start again, without reading the squares already read
+    square = machine._figures_square
+    assert ''.join(machine.figures(20)) == figures[:20] and machine._step == reference._step
+    assert machine._figures_square == square
+    assert ''.join(machine.figures(40)) == '0010110111011110111110111111011111110111'
+    machine.reset()
+    assert ''.join(machine.figures(5)) == '00101' and machine._figures_square < square
+
+
+def test_async_machines_take_turns():
+    async def main():
+        machines = [TuringMachine('b', increasing) for _ in range(20)]
+        counts = await asyncio.gather(*(machine.arun(5_000 + 100 * i, chunk=1_000)
+                                        for i, machine in enumerate(machines)))
+        assert counts == [5_000 + 100 * i for i in range(20)]
+        reference = TuringMachine('b', increasing)
+        reference.run(5_000)
+        assert _state(machines[0]) == _state(reference)
+
+        # Chunks are interleaved, and cancelling leaves the machine at a chunk boundary
+        forever, order = TuringMachine('b', increasing), []
+
+        async def consume(machine):
+            async for _ in machine.asteps(chunk=500):
+                order.append(machine)
+        task = asyncio.ensure_future(consume(forever))
+        async for _ in machines[1].asteps(2_000, chunk=500):
+            order.append(machines[1])
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert forever in order[:3] and forever._step % 500 == 0 and forever._step > 0
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize('conditions, termination', [
+    (dict(stop_m_configs=['p']), Termination('m-config', 5)),
+    (dict(stop_symbols=['x']), Termination('symbol', 13)),
+    (dict(max_cells=40), Termination('cells', 185)),
+])
+def test_stop_conditions_and_stride(conditions, termination):
+    machine = TuringMachine('b', increasing)
+    assert machine.run(10_000, **conditions) == termination.step and machine.termination == termination
+    # The compiled and the step by step paths stop at the same place, yielding only every stride steps
+    for debug in (False, True):
+        strided = TuringMachine('b', increasing)
+        yielded = [snapshot.step for snapshot in strided.steps(stride=7, debug=debug, snapshots=True, **conditions)]
+        assert yielded == list(range(0, termination.step, 7)) + [termination.step]
+        assert _state(strided) == _state(machine) and strided.termination == termination
+    # Without conditions, every stride'th configuration, as step by step
+    reference = TuringMachine('b', increasing)
+    reference.run(7_000)
+    assert [m._step for m in machine.steps(1_001, stride=7)][-1] == 7_000 and _state(machine) == _state(reference)
+
+
+def test_cells_limit_stops_before_writes_crossing_it():
+    # Each step writes four squares; the third would make the tape 12 squares long, so the run stops before it
+    table = Table({'b': {E: (['1', R, '1', R, '1', R, '1', R], 'b')}})
+    for max_cells in (10, 11):
+        machine = TuringMachine('b', table)
+        assert machine.run(100, max_cells=max_cells) == 2 and machine.termination == Termination('cells', 2)
+        assert machine._tape.extent == (0, 8) and machine._position == 8
+        for debug in (False, True):
+            stepped = TuringMachine('b', table)
+            assert [m._step for m in stepped.steps(debug=debug, max_cells=max_cells)] == [0, 1, 2]
+            assert _state(stepped) == _state(machine) and stepped._tape.extent == machine._tape.extent
+    assert TuringMachine('b', table).run(100, max_cells=12) == 3
+
+
+def test_strided_snapshots_share_keyframes():
+    machine = TuringMachine('b', increasing)
+    history = list(machine.steps(200, stride=50, snapshots=True))
+    reference = TuringMachine('b', increasing)
+    for snapshot in history:
+        _reference_steps(reference, snapshot.step - reference._step)
+        assert snapshot.str_complete_configuration() == reference.str_complete_configuration()
+    assert sum(snapshot._keyframe is not None for snapshot in history) < len(history) // 10
+
+
+def test_long_moves_match_single_moves():
+    table = Table(increasing_long)
+    assert table._is_long_moves and not Table(increasing)._is_long_moves
+    assert 'R2' in str(table.behavior('q', '0')) and 'L3' in str(table.behavior('o', '1'))
+    for steps in (1, 7, 3000):
+        long, single, reference = (TuringMachine('b', table), TuringMachine('b', increasing),
+                                   TuringMachine('b', table))
+        long.run(steps)
+        _reference_steps(single, steps)
+        _reference_steps(reference, steps)
+        assert _state(long)[:3] == _state(single)[:3] == _state(reference)[:3]
+        long = TuringMachine('b', table)
+        for _ in range(steps):
+            long.step()
+        assert _state(long) == _state(reference) and long._tape.extent == reference._tape.extent
+
+
+def test_optimize_prunes_merges_and_fuses():
+    # Two copies of the same pair of m-configurations, and one that can't be reached
+    table = Table({'b0': {E: (['0', R], 'c0')}, 'c0': {E: ([E, R], 'b1')},
+                   'b1': {E: (['0', R], 'c1')}, 'c1': {E: ([E, R], 'b0')},
+                   'z': {E: (['1', R], 'z')}})
+    optimized, report = table.optimize('b0', trial_steps=100)
+    assert set(optimized.dict) == {'b0', 'c0'} and optimized._is_standard_form
+    assert (report.m_configs, report.pruned, report.merged, report.fused) == ((5, 2), 1, 2, 0)
+    assert report.description[1] < report.description[0] and report.steps == (100, 100)
+    original, smaller = TuringMachine('b0', table), TuringMachine('b0', optimized)
+    _reference_steps(original, 100)
+    _reference_steps(smaller, 100)
+    assert _state(original)[:3] == _state(smaller)[:3]
+
+    # Fused, behaviors do the work of those that must follow them, in fewer steps
+    optimized, report = Table(increasing).optimize('b', trial_steps=5_000)
+    assert report.fused and report.steps[1] < report.steps[0] == 5_000
+    original, fused = TuringMachine('b', increasing), TuringMachine('b', optimized)
+    _reference_steps(original, report.steps[0])
+    _reference_steps(fused, report.steps[1])
+    assert original.str_tape().replace(E, '') == fused.str_tape().replace(E, '')
+
+
+@pytest.mark.parametrize('m_config, instructions, tape', [
+    ('b', increasing, E),
+    ('b', increasing_long, E),
+    ('r', increment, '101011'),
+    ('b', {'b': {E: (['a', -3, 'b', 5, 'c'], 'b')}}, E),
+    ('q1', Table.dict_from_representation(3133225317, 'DN'), E),
+])
+@pytest.mark.parametrize('steps', [0, 1, 100, 2000])
+def test_run_specialized_matches_step(m_config, instructions, tape, steps) -> None:
+    stepped = TuringMachine(m_config, instructions, initial_tape=tape)
+    _reference_steps(stepped, steps)
+    specialized = TuringMachine(m_config, instructions, initial_tape=tape)
+    specialized.run_specialized(steps // 3)
+    specialized.run_specialized(steps - steps // 3)
+    assert _state(specialized) == _state(stepped) and specialized._tape.extent == stepped._tape.extent
+
+
+@pytest.mark.parametrize('backend', [TwoWayTape.from_tape, MMapTape.from_tape])
+def test_plain_runs_go_specialized_once_warm(backend):
+    # Runs without trace or stop conditions take the table's first steps themselves, then the rest specialized
+    table = Table(alternate_standard)
+    warming = table._warming()
+    assert 0 < warming < 100_000 and table._specialized is None
+    traced = TuringMachine('b', table, tape_backend=backend)
+    traced.run(100_000, trace=lambda entry: None)
+    assert table._warming() == warming and table._specialized is None
+    ran = TuringMachine('b', table, tape_backend=backend)
+    assert ran.run(100_000) == 100_000
+    assert table._warming() == 0 and table._specialized is not None
+    assert _state(ran) == _state(traced) and ran._tape.extent == traced._tape.extent
+    assert ran.run(1) == 1 and table._plain_steps == warming
+
+
+def test_plain_runs_leave_specialized_functions_that_call_too_often():
+    # Going round more m-configurations than are written inline, the specialized function calls the function for
+    # one every few steps, so once it has taken as many steps as warming up did, plain runs go back to run() itself
+    instructions = {'m{}'.format(m): {E: (['P1', R], 'm{}'.format((m + 1) % 7))} for m in range(7)}
+    table = Table(instructions)
+    warming = table._warming()
+    ran, stepped = TuringMachine('m0', table), TuringMachine('m0', instructions)
+    assert ran.run(warming) == warming and table._probing() == warming
+    assert ran.run(3 * warming) == 3 * warming and table._probing() is None
+    assert table._specialized_steps == warming and table._specialized_calls >= warming // 5
+    assert ran.run(10) == 10 and table._specialized_steps == warming
+    _reference_steps(stepped, 4 * warming + 10)
+    assert _state(ran) == _state(stepped)
+
+
+@pytest.mark.parametrize('instructions', [increasing, increasing_long])
+def test_specialized_sweeps_stop_anywhere(instructions):
+    # Scans right and left over runs of squares are crossed many steps at a time, but stop at any step count
+    assert 'sweep(cells, i, ' in Table(instructions).specialized_source()
+    stepped, specialized = TuringMachine('b', instructions), TuringMachine('b', instructions)
+    for chunk in [1, 2, 3, 5, 7, 11, 13] * 40:
+        _reference_steps(stepped, chunk)
+        assert specialized.run_specialized(chunk) == chunk
+        assert _state(specialized) == _state(stepped) and specialized._tape.extent == stepped._tape.extent
+
+
+def test_specialized_steps_between_m_configs_inline():
+    # Steps from one m-configuration to another are written inline a few deep, stopping at any step count; tables too
+    # large for that are run by run() itself
+    rng = random.Random(7)
+
+    def shuffled(n):
+        return {'m{}'.format(m): {s: ([rng.choice([E, '1', '2']), rng.choice([R, L])], 'm{}'.format(rng.randrange(n)))
+                                  for s in [E, '1', '2']} for m in range(n)}
+    instructions = shuffled(30)
+    assert Table(instructions).specialize() is not None and 'state = -' in Table(instructions).specialized_source()
+    stepped, specialized = TuringMachine('m0', instructions), TuringMachine('m0', instructions)
+    for chunk in [1, 2, 3, 5, 7, 11, 13] * 40:
+        _reference_steps(stepped, chunk)
+        assert specialized.run_specialized(chunk) == chunk
+        assert _state(specialized) == _state(stepped) and specialized._tape.extent == stepped._tape.extent
+    instructions = shuffled(2000)
+    assert Table(instructions).specialize() is None
+    ran, specialized = TuringMachine('m0', instructions), TuringMachine('m0', instructions)
+    ran.run(10_000)
+    assert specialized.run_specialized(10_000) == 10_000 and _state(specialized) == _state(ran)
+
+
+def test_specialized_functions_are_shared():
+    table, same = Table(increasing), Table(increasing)
+    assert table.specialize() is same.specialize()
+    assert table.specialize() is not Table(increasing_long).specialize()
+    assert "def s0(cells, base, lo, hi, size, i, steps, last):  # 'b'" in table.specialized_source()
+
+
+def test_specialized_functions_are_evicted(monkeypatch):
+    import machine
+    monkeypatch.setattr(machine, '_SPECIALIZED', machine.OrderedDict())
+    monkeypatch.setattr(machine, '_SPECIALIZED_CACHE', 2)
+    first = Table(increasing).specialize()
+    Table(increasing_long).specialize()
+    assert Table(increasing).specialize() is first
+    Table({'b': {E: (['P0', R], 'b')}}).specialize()
+    assert len(machine._SPECIALIZED) == 2 and Table(increasing).digest in machine._SPECIALIZED
+    assert Table(increasing_long).digest not in machine._SPECIALIZED
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+import json
+
+import pytest
+
+from machine import TuringMachine, InstrumentedMachine
+from profiling import Profiler
+from test_machine import increasing
+
+
+def test_profile_step_and_run_agree():
+    stepped, ran = TuringMachine('b', increasing), TuringMachine('b', increasing)
+    with Profiler(stepped) as step_profile:
+        for _ in stepped.steps(500, include_current=False):
+            pass
+    with Profiler(ran) as run_profile:
+        ran.run(500)
+    assert 'step' not in vars(stepped) and 'run' not in vars(ran)
+    assert step_profile.steps == run_profile.steps == 500
+    assert step_profile.rule_hits == run_profile.rule_hits
+    assert step_profile.positions == run_profile.positions
+    assert step_profile.growth == run_profile.growth
+    assert step_profile.hot_rules(1) == run_profile.hot_rules(1)
+    assert json.loads(run_profile.to_json())['steps'] == 500
+
+
+@pytest.mark.parametrize('fast_run', [TuringMachine.run_specialized, TuringMachine.run_macro])
+def test_fast_runs_refuse_to_bypass_a_profiler(fast_run):
+    machine = TuringMachine('b', increasing)
+    with Profiler(machine) as profile:
+        with pytest.raises(InstrumentedMachine):
+            fast_run(machine, 100)
+    assert profile.steps == 0 and fast_run(machine, 100) == 100
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+from machine import Table, Termination
+from skeletons import Skeleton, SkeletonMachine, turing_m_functions
+
+
+def test_m_functions_instantiated_lazily():
+    skeleton = turing_m_functions(Skeleton('əxy01'))
+    ran = SkeletonMachine(('ce2', 'done', 'x', 'y'), skeleton, initial_tape='əə0x1y0 ')
+    assert ran.run() == 129
+    assert ran.str_tape().strip() == 'əə0 1 0 0 1'
+    assert ran._m_configuration == 'done'
+    # Only what was reached is instantiated, once, and shared with the next machine
+    instantiated = len(skeleton._rules)
+    assert 'ce(ce(done, y), x)' in skeleton._rules and "f'(c1(e(ce(done, y), done, y)), done, y)" in skeleton._rules
+    assert not any(name.startswith(('cp', 're', 'g')) for name in skeleton._rules)
+    stepped = SkeletonMachine(('ce2', 'done', 'x', 'y'), skeleton, initial_tape='əə0x1y0 ')
+    for _ in stepped.steps(200, include_current=False):
+        pass
+    assert (stepped._step, stepped.str_tape()) == (129, ran.str_tape())
+    assert len(skeleton._rules) == instantiated
+
+
+def test_tables_built_in_batches(monkeypatch):
+    import skeletons
+    built = []
+    monkeypatch.setattr(skeletons, 'Table', lambda rules, **kw: built.append(len(rules)) or Table(rules, **kw))
+    skeleton = turing_m_functions(Skeleton('əxy01'))
+    assert SkeletonMachine(('ce2', 'done', 'x', 'y'), skeleton, initial_tape='əə0x1y0 ').run() == 129
+    # Each table built is at least twice the size of the one before, but for the last, bounded by what remains
+    assert all(2 * previous <= size for previous, size in zip(built, built[1:-1]))
+    assert len(built) <= len(skeleton._rules).bit_length() + 1
+
+
+def test_only_m_configurations_reached_are_instantiated():
+    skeleton = turing_m_functions(Skeleton('əxy01'))
+    stepped = SkeletonMachine(('ce2', 'done', 'x', 'y'), skeleton, initial_tape='əə0x1y0 ')
+    reached = {stepped._m_configuration} | {machine._m_configuration for machine in stepped.steps(200)}
+    assert stepped._step == 129 and set(skeleton._rules) == reached - {'done'}
+    # Runs with stop conditions take no step the table doesn't have, so rebuild it as they reach more
+    skeleton = turing_m_functions(Skeleton('əxy01'))
+    ran = SkeletonMachine(('ce2', 'done', 'x', 'y'), skeleton, initial_tape='əə0x1y0 ')
+    assert ran.run(stop_m_configs=['done']) == 129 and ran.termination == Termination('m-config', 129)
+    assert (ran.str_tape(), set(skeleton._rules)) == (stepped.str_tape(), reached - {'done'})
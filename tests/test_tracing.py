@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+from machine import TuringMachine, Table
+from tracing import TraceRecorder, TraceReplay
+from test_machine import increasing, _state
+
+
+def test_replay_matches_run(tmp_path):
+    table = Table(increasing)
+    path = str(tmp_path / 'run.trace')
+    with TraceRecorder(TuringMachine('b', table), path, keyframe_interval=1000) as recorder:
+        assert recorder.run(5500) == 5500
+    replay = TraceReplay(path, table)
+    assert replay.last == 5500
+    for step in (0, 1, 999, 1000, 4321, 5500):
+        machine = TuringMachine('b', table)
+        machine.run(step)
+        assert _state(replay.seek(step)) == _state(machine)
+    machine = replay.seek(4321)
+    assert replay.record(4321)[:3] == (4321, machine._m_configuration, machine._position)
+    replay.close()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+import sys
+import os
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+
+from machine import Table, R, L, N, E
+from universal import UniversalMachine
+
+
+def test_accelerated_matches_universal_machine():
+    table = Table({'a': {E: (['1', R], 'b'), '1': (['0', R], 'a'), '0': (['1', N], 'b')},
+                   'b': {E: (['0', L], 'a'), '1': (['1', L], 'a'), '0': (['0', R], 'b')}})
+    accelerated = UniversalMachine(table.instructions('SD', 'string'))
+    assert accelerated.printed(3) == ':DAD:1:DCCDAAD:0:DADCCDC:0:DCDADC:'
+    assert accelerated.figures(10) == '1001111001'
+    assert accelerated.cross_check(200_000)
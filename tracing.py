@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""
+Recording long runs of a machine as compact binary traces, and replaying them from any step.
+
+A trace is two files: path holds one fixed width record per step (the step, the new m-configuration and head position,
+and the symbols scanned and left on the scanned square), and path + '.keys' holds keyframes, complete saved machines
+(see TuringMachine.save), taken every keyframe_interval steps. Reaching step N means loading the last keyframe before
+it and applying at most keyframe_interval records, however long the run.
+"""
+
+from __future__ import annotations
+
+import bisect
+import io
+import itertools
+import struct
+from typing import NamedTuple, Generator, Union
+
+from machine import TuringMachine, Table, InstructionsDict, MConfig, Symbol, _SPECIAL
+
+_TRACE_MAGIC = b'TMTRACE\x01'
+_RECORD = struct.Struct('<QIqBB')       # Step, m-configuration, position, scanned symbol, written symbol
+_KEYFRAME = struct.Struct('<QQ')        # Step, length of the saved machine that follows
+_HEADER = struct.Struct('<32sQ')        # Table digest, keyframe interval
+
+
+class TraceRecord(NamedTuple):
+    step: int
+    m_config: MConfig       # After the step
+    position: int           # After the step
+    scanned: Symbol
+    written: Symbol         # Left on the scanned square
+
+
+class TraceRecorder(object):
+    """Runs a machine, recording each step it takes to a trace at path."""
+
+    def __init__(self, machine: TuringMachine, path: str, keyframe_interval: int = 1_000_000) -> None:
+        self._machine = machine
+        self._interval = keyframe_interval
+        self._records = open(path, 'wb')
+        self._keyframes = open(path + '.keys', 'wb')
+        self._records.write(_TRACE_MAGIC + _HEADER.pack(machine._table.digest, keyframe_interval))
+        self._keyframe()
+
+    def _keyframe(self) -> None:
+        saved = io.BytesIO()
+        self._machine.save(saved)
+        self._keyframes.write(_KEYFRAME.pack(self._machine._step, len(saved.getvalue())) + saved.getvalue())
+
+    # Run up to max_steps steps (until the machine halts if None), as TuringMachine.run() does; returns steps taken
+    def run(self, max_steps: int = None) -> int:
+        machine = self._machine
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            chunk = self._interval - machine._step % self._interval
+            if max_steps is not None:
+                chunk = min(chunk, max_steps - steps)
+            first = machine._step + 1
+            records = []
+            taken = machine.run(chunk, records.append)
+            self._records.write(b''.join(itertools.starmap(_RECORD.pack, (
+                (step, *record) for step, record in zip(itertools.count(first), records)))))
+            steps += taken
+            if machine._step % self._interval == 0 and taken:
+                self._keyframe()
+            if taken < chunk:
+                break
+        return steps
+
+    def close(self) -> None:
+        self._records.close()
+        self._keyframes.close()
+
+    def __enter__(self) -> TraceRecorder:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TraceReplay(object):
+    """Random access to a trace recorded by TraceRecorder with the same instructions."""
+
+    def __init__(self, path: str, instructions: Union[InstructionsDict, Table]) -> None:
+        self._table = instructions if isinstance(instructions, Table) else Table(instructions)
+        self._compiled = self._table.compile()
+        self._records = open(path, 'rb')
+        magic = self._records.read(len(_TRACE_MAGIC))
+        digest, self._interval = _HEADER.unpack(self._records.read(_HEADER.size))
+        assert magic == _TRACE_MAGIC and digest == self._table.digest, "Not a trace of this table"
+        self._start = len(_TRACE_MAGIC) + _HEADER.size
+
+        # Keyframes are few, so the saved machines are all kept in memory
+        self._keyframe_steps, self._keyframe_data = [], []
+        with open(path + '.keys', 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            step, length = _KEYFRAME.unpack_from(data, offset)
+            offset += _KEYFRAME.size
+            self._keyframe_steps.append(step)
+            self._keyframe_data.append(data[offset:offset + length])
+            offset += length
+        self._first = self._keyframe_steps[0]
+        self._records.seek(0, io.SEEK_END)
+        self.last = self._first + (self._records.tell() - self._start) // _RECORD.size
+
+    # Raw records for the steps from start to stop - 1
+    def _raw(self, start: int, stop: int) -> Generator[tuple[int, int, int, int, int], None, None]:
+        self._records.seek(self._start + (start - self._first - 1) * _RECORD.size)
+        yield from _RECORD.iter_unpack(self._records.read((stop - start) * _RECORD.size))
+
+    def records(self, start: int = None, stop: int = None) -> Generator[TraceRecord, None, None]:
+        start = self._first + 1 if start is None else max(start, self._first + 1)
+        stop = self.last + 1 if stop is None else min(stop, self.last + 1)
+        m_configs, symbols = self._compiled.m_configs, self._compiled.symbols
+        for step, state, position, scanned, written in self._raw(start, stop):
+            yield TraceRecord(step, m_configs[state], position, symbols[scanned], symbols[written])
+
+    def record(self, step: int) -> TraceRecord:
+        assert self._first < step <= self.last, f"Step {step} is not in the trace"
+        return next(self.records(step, step + 1))
+
+    # The machine as it was at step, from the nearest keyframe and the records since
+    def seek(self, step: int) -> TuringMachine:
+        assert self._first <= step <= self.last, f"Step {step} is not in the trace"
+        keyframe = bisect.bisect_right(self._keyframe_steps, step) - 1
+        machine = TuringMachine.load(io.BytesIO(self._keyframe_data[keyframe]), self._table)
+        compiled, tape = self._compiled, machine._tape
+        n = len(compiled.m_configs)
+        state = compiled.m_config_index[machine._m_configuration]
+        position = machine._position
+        for _, next_state, next_position, scanned, written in self._raw(self._keyframe_steps[keyframe] + 1, step + 1):
+            k = scanned * n + state
+            if compiled.next[k] == _SPECIAL:
+                for offset, sym in compiled.special[k][0]:
+                    tape.patch_code(position + offset, sym)
+            tape.patch_code(position, written)
+            state, position = next_state, next_position
+            machine._step_comment = compiled.comment[k]
+        machine._m_configuration, machine._position, machine._step = compiled.m_configs[state], position, step
+        return machine
+
+    def close(self) -> None:
+        self._records.close()
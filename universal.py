@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""
+Turing's universal machine U (Turing pp. 243-246), both as written, built from its skeleton table, and accelerated.
+
+U is given a tape holding ə ə and then, on F-squares, the S.D. of a machine M followed by ::. It prints on the
+F-squares that follow, separated by colons, each complete configuration of M (started in DA on a blank tape) in
+the S.D.'s notation, and, between them, any figure M prints. Doing that takes U many thousands of its own steps for
+each step of M; UniversalMachine decodes the S.D. once, runs M itself, and produces the same output directly.
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Generator
+
+from machine import TuringMachine, Table, Behavior, Symbol, Tape, FORMAT_CHARS, E_SYMBOLS, E, L, R, parse_description
+from skeletons import Skeleton, SkeletonMachine, turing_m_functions
+
+_SD_M_CONFIG = FORMAT_CHARS['SD']['m_config_format_fn']
+_SD_SYMBOL = FORMAT_CHARS['SD']['symbol_format_fn']
+
+# Symbols of M, by their index in the S.D. (D, DC, DCC, ...); as in Table.dict_from_representation()
+_M_SYMBOLS = [E, '0', '1'] + E_SYMBOLS
+
+
+# ======== U as Turing wrote it, with his 1937 correction to con1; sim1 and sim2 are corrected to mark the whole of
+# the symbol an instruction prints (including its D) with u, and sh1 and sh2 to count its Cs from there
+
+# U finds instructions by the semicolon before each, so the S.D. (whose instructions each end with one) is written
+# with the last semicolon moved to the front
+def universal_tape(sd: str) -> Tape:
+    tape = ['ə', 'ə']
+    for char in ';' + sd.strip()[:-1]:
+        tape.extend([char, E])
+    tape.append('::')
+    return tape
+
+
+def universal_skeleton() -> Skeleton:
+    skeleton = turing_m_functions(Skeleton(['ə', '::', ':', ';', 'D', 'A', 'C', 'L', 'R', 'N', '0', '1',
+                                            'u', 'v', 'w', 'x', 'y', 'z']))
+    m_function, any_ = skeleton.m_function, skeleton.any
+
+    def every():
+        return E, *any_()
+
+    def other(*excluded: Symbol):
+        return tuple(sym for sym in every() if sym not in excluded)
+
+    # Mark the m-configuration and scanned symbol of the next complete configuration with α, then go to C
+    @m_function
+    def con(C, a):
+        return {'A': ([L, a, R], ('con1', C, a)),
+                other('A'): ([R, R], ('con', C, a))}
+
+    @m_function
+    def con1(C, a):
+        return {'A': ([R, a, R], ('con1', C, a)),
+                'D': ([R, a, R], ('con2', C, a)),
+                E: (['D', R, a, R, R, R], C)}
+
+    @m_function
+    def con2(C, a):
+        return {'C': ([R, a, R], ('con2', C, a)),
+                other('C'): ([R, R], C)}
+
+    @m_function
+    def b():
+        return {every(): ([], ('f', 'b1', 'b1', '::'))}
+
+    @m_function
+    def b1():
+        return {every(): ([R, R, ':', R, R, 'D', R, R, 'A'], 'anf')}
+
+    # Find the last complete configuration and mark its m-configuration and scanned symbol y
+    @m_function
+    def anf():
+        return {every(): ([], ('g', 'anf1', ':'))}
+
+    @m_function
+    def anf1():
+        return {every(): ([], ('con', 'kom', 'y'))}
+
+    # Find the last instruction not yet compared (marked z), and compare it with the marks y
+    @m_function
+    def kom():
+        return {';': ([R, 'z', L], ('con', 'kmp', 'x')),
+                'z': ([L, L], 'kom'),
+                other('z', ';'): ([L], 'kom')}
+
+    @m_function
+    def kmp():
+        return {every(): ([], ('cpe', ('e', ('e', 'anf', 'x'), 'y'), 'sim', 'x', 'y'))}
+
+    # Mark the instruction found: u for the symbol printed and move, y for the final m-configuration
+    @m_function
+    def sim():
+        return {every(): ([], ("f'", 'sim1', 'sim1', 'z'))}
+
+    @m_function
+    def sim1():
+        return {every(): ([], ('con', ('l', ('l', 'sim2')), E))}
+
+    @m_function
+    def sim2():
+        return {'A': ([], 'sim3'),
+                other('A'): ([R, 'u', R], 'sim2')}
+
+    @m_function
+    def sim3():
+        return {'A': ([L, 'y', R, R, R], 'sim3'),
+                other('A'): ([L, 'y'], ('e', 'mk', 'z'))}
+
+    # Mark the last complete configuration: x for the symbols before the scanned one, v for the one before it, w
+    # for those after it, and print : after it
+    @m_function
+    def mk():
+        return {every(): ([], ('g', 'mk1', ':'))}
+
+    @m_function
+    def mk1():
+        return {'A': ([L, L, L, L], 'mk2'),
+                other('A'): ([R, R], 'mk1')}
+
+    @m_function
+    def mk2():
+        return {'C': ([R, 'x', L, L, L], 'mk2'),
+                ':': ([], 'mk4'),
+                'D': ([R, 'x', L, L, L], 'mk3')}
+
+    @m_function
+    def mk3():
+        return {':': ([], 'mk4'),
+                other(':'): ([R, 'v', L, L, L], 'mk3')}
+
+    @m_function
+    def mk4():
+        return {every(): ([], ('con', ('l', ('l', 'mk5')), E))}
+
+    @m_function
+    def mk5():
+        return {any_(): ([R, 'w', R], 'mk5'),
+                E: ([':'], 'sh')}
+
+    # Print the figure the instruction prints, if it prints one
+    @m_function
+    def sh():
+        return {every(): ([], ('f', 'sh1', 'inst', 'u'))}
+
+    @m_function
+    def sh1():
+        return {every(): ([L], 'sh2')}
+
+    @m_function
+    def sh2():
+        return {'D': ([R, R], 'sh3'),
+                other('D'): ([], 'inst')}
+
+    @m_function
+    def sh3():
+        return {'C': ([R, R], 'sh4'),
+                other('C'): ([], 'inst')}
+
+    @m_function
+    def sh4():
+        return {'C': ([R, R], 'sh5'),
+                other('C'): ([], ('pe2', 'inst', '0', ':'))}
+
+    @m_function
+    def sh5():
+        return {'C': ([], 'inst'),
+                other('C'): ([], ('pe2', 'inst', '1', ':'))}
+
+    # Print the next complete configuration, then erase every mark and start again
+    @m_function
+    def inst():
+        return {every(): ([], ('g', ('l', 'inst1'), 'u'))}
+
+    @m_function
+    def inst1():
+        return {'L': ([R, E], ('ce5', 'ov', 'v', 'y', 'x', 'u', 'w')),
+                'R': ([R, E], ('ce5', 'ov', 'v', 'x', 'u', 'y', 'w')),
+                'N': ([R, E], ('ce5', 'ov', 'v', 'x', 'y', 'u', 'w'))}
+
+    @m_function
+    def ov():
+        return {every(): ([], ('e', 'anf'))}
+
+    return skeleton
+
+
+# U, as written, ready to run on sd
+def universal_machine(sd: str, skeleton: Skeleton = None) -> SkeletonMachine:
+    return SkeletonMachine('b', universal_skeleton() if skeleton is None else skeleton,
+                           initial_tape=universal_tape(sd))
+
+
+# What U has printed after the ::, reading its F-squares up to the first blank one
+def universal_output(machine: TuringMachine) -> str:
+    tape = machine._tape
+    lo, hi = tape.extent
+    squares = tape.squares(lo, hi + 1)
+    start = squares.index('::') + 2
+    return ''.join(itertools.takewhile(lambda sym: sym != E, squares[start::2]))
+
+
+# ======== U accelerated
+
+class UniversalMachine(object):
+    """The machine M described by an S.D., run directly, producing what U would print when given the S.D.
+
+    Each complete configuration is given in full: the symbols of every square from the first to the furthest the
+    head has reached (including any U has yet to add a D for), with the m-configuration before the scanned symbol.
+    """
+
+    def __init__(self, sd: str) -> None:
+        self.sd = sd
+        instructions = {}
+        for initial, read, written, move, final, _ in parse_description(sd, 'SD'):
+            instructions.setdefault(_SD_M_CONFIG(initial), {})[_M_SYMBOLS[read]] = Behavior(
+                [_M_SYMBOLS[written], move], _SD_M_CONFIG(final))
+        self.table = Table(instructions)
+        self._codes = {sym: _SD_SYMBOL(i) for i, sym in enumerate(_M_SYMBOLS)}
+
+    def _complete_configuration(self, machine: TuringMachine, furthest: int) -> str:
+        squares = [self._codes[sym] for sym in machine._tape.squares(0, furthest + 1)]
+        position = machine._position
+        return ''.join(squares[:position]) + machine._m_configuration + ''.join(squares[position:])
+
+    # The complete configurations and figures U prints, in order, for up to steps steps of M (or until M halts)
+    def outputs(self, steps: int = None) -> Generator[str, None, None]:
+        machine = TuringMachine(_SD_M_CONFIG(0), self.table)
+        written = []
+        furthest = 0
+        yield self._complete_configuration(machine, furthest)
+        for _ in range(steps) if steps is not None else itertools.count():
+            if machine.run(1, written.append) == 0:
+                return
+            # U's complete configurations have no squares left of the first, so moving left from it is staying put
+            machine._position = max(machine._position, 0)
+            figure = machine._tape.symbols[written.pop()[3]]
+            if figure in ('0', '1'):
+                yield figure
+            furthest = max(furthest, machine._position)
+            yield self._complete_configuration(machine, furthest)
+
+    # Just the figures: the sequence M computes
+    def figures(self, steps: int = None) -> str:
+        return ''.join(output for output in self.outputs(steps) if output in ('0', '1'))
+
+    # What U would have printed after the :: by the time M had taken steps steps
+    def printed(self, steps: int = None) -> str:
+        return ':' + ''.join(output + ':' for output in self.outputs(steps))
+
+    # Run U itself for u_steps of its steps, and check that everything it has printed is what this predicts
+    def cross_check(self, u_steps: int = 100_000) -> bool:
+        u = universal_machine(self.sd)
+        u.run(u_steps)
+        printed = universal_output(u)
+        expected = ':'
+        for output in self.outputs():
+            if len(expected) > len(printed):
+                break
+            expected += output + ':'
+        return expected.startswith(printed)